@@ -0,0 +1,260 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+
+import degrees
+import ingest
+
+# Whether unmatched names resolve to their closest suggestion
+fuzzy = False
+
+
+def resolve(query):
+    """
+    Returns (person_id, error) for a person_id or an unambiguous name.
+    Batch queries cannot prompt, so ambiguous names are an error that
+    lists the candidate ids, and unknown names an error that lists the
+    closest names (or, with fuzzy set, resolve to the closest one).
+    """
+    query = str(query).strip()
+    if query in degrees.store.person_index:
+        return query, None
+
+    person_ids = degrees.ids_for_name(query)
+    if len(person_ids) == 1:
+        return person_ids[0], None
+    elif not person_ids:
+        suggestions = degrees.suggest_names(query)
+        if fuzzy and suggestions:
+            return suggestions[0], None
+        return None, {
+            "error": "person not found",
+            "query": query,
+            "suggestions": [
+                {"person_id": person_id, "name": degrees.person_name(person_id),
+                 "birth": degrees.person_birth(person_id)}
+                for person_id in suggestions
+            ],
+        }
+    return None, {
+        "error": "ambiguous name",
+        "query": query,
+        "candidates": [
+            {"person_id": person_id, "birth": degrees.person_birth(person_id)}
+            for person_id in sorted(person_ids)
+        ],
+    }
+
+
+def answer(source, target):
+    """Returns the JSON-ready result of one source/target query."""
+    result = {"source": source, "target": target}
+
+    source_id, error = resolve(source)
+    if error is None:
+        target_id, error = resolve(target)
+    if error is not None:
+        result.update(error)
+        return result
+
+    return describe(result, source_id, target_id,
+                    degrees.shortest_path(source_id, target_id))
+
+
+def describe(result, source_id, target_id, path):
+    """Fills in result with a path from shortest_path."""
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = [
+        {
+            "movie_id": movie_id,
+            "movie": degrees.movie_title(movie_id),
+            "person_id": person_id,
+            "person": degrees.person_name(person_id),
+        }
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def parse(line):
+    """
+    Returns the (source, target) of a query line: a JSON object with
+    source and target keys, or the two separated by a tab.
+    Returns None for blank lines.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        query = json.loads(line)
+        return query["source"], query["target"]
+    source, target = line.split("\t")
+    return source, target
+
+
+def queries(lines):
+    """Yields (source, target) pairs, or an error result for bad lines."""
+    for number, line in enumerate(lines, 1):
+        try:
+            pair = parse(line)
+        except (ValueError, KeyError, TypeError):
+            yield {"error": "malformed query", "line": number}
+            continue
+        if pair is not None:
+            yield pair
+
+
+def answer_query(query):
+    """answer() for an item from queries(), passing errors straight through."""
+    return query if isinstance(query, dict) else answer(*query)
+
+
+def start_worker(directory, tree_budget=0, fuzzy_names=False, astar=False):
+    """
+    Pool initializer. Forked workers inherit the parent's store; others
+    map the same snapshot file, so the graph is shared read-only through
+    the page cache instead of being pickled to each worker.
+    """
+    global fuzzy
+    if degrees.store is None:
+        degrees.load_data(directory, compact=True)
+    degrees.use_tree_cache(tree_budget)
+    if astar and degrees.landmarks is None:
+        load_landmarks(directory)
+    fuzzy = fuzzy_names
+
+
+def load_landmarks(directory):
+    """
+    Turns on landmark A* with the index landmarks.py saved in directory,
+    loading it now so threads never race to load it on first use.
+    """
+    degrees.use_landmarks(directory)
+    if degrees.landmarks.get() is None:
+        print(f"No landmark index in {directory}; run landmarks.py {directory} to "
+              "build one. Using plain search.", file=sys.stderr)
+
+
+def answer_parallel(items, directory, processes=None, chunksize=64, tree_budget=0):
+    """
+    Yields answer_query() for each item, fanned out over a process pool
+    of the given size (default: one per core). Results come back in
+    input order. The caller must already have loaded directory, so its
+    snapshot exists for the workers to map. Each worker keeps its own
+    tree cache of tree_budget bytes.
+    """
+    initargs = (directory, tree_budget, fuzzy, degrees.landmarks is not None)
+    with multiprocessing.Pool(processes, start_worker, initargs) as pool:
+        yield from pool.imap(answer_query, items, chunksize)
+
+
+def run_stream(lines, out, flush=False, directory=None, processes=1):
+    """
+    Answers every query in lines, writing one JSON result per line to out.
+    Set flush to send each result as soon as it is ready. With processes
+    other than 1, queries are spread over that many workers (None for
+    one per core) that load directory.
+    """
+    items = queries(lines)
+    if processes == 1:
+        results = map(answer_query, items)
+    else:
+        tree_budget = degrees.tree_cache.budget if degrees.tree_cache else 0
+        results = answer_parallel(items, directory, processes, tree_budget=tree_budget)
+
+    for result in results:
+        out.write(json.dumps(result) + "\n")
+        if flush:
+            out.flush()
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """Answers newline-delimited queries on a socket connection."""
+
+    def handle(self):
+        lines = (line.decode("utf-8") for line in self.rfile)
+        out = io.TextIOWrapper(self.wfile, encoding="utf-8", write_through=True)
+        run_stream(lines, out, flush=True)
+        out.detach()
+
+
+def serve(address):
+    """
+    Answer queries over a local socket until interrupted. address is
+    host:port for TCP, otherwise a Unix socket path.
+    """
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+        server = socketserver.ThreadingTCPServer((host, int(port)), QueryHandler)
+    else:
+        if os.path.exists(address):
+            os.remove(address)
+        server = socketserver.ThreadingUnixStreamServer(address, QueryHandler)
+
+    server.daemon_threads = True
+    with server:
+        print(f"Serving on {address}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees queries against one loaded graph."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", "-i", default="-",
+                        help="file of queries, one per line (default: stdin)")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="listen on host:port or a Unix socket path instead")
+    parser.add_argument("--workers", "-j", type=int, default=1,
+                        help="worker processes for file/stdin queries (0: one per core)")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="resolve unmatched names to their closest match")
+    parser.add_argument("--tree-cache", type=int, default=0, metavar="MB",
+                        help="cache whole BFS trees per source, up to MB megabytes")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="search with landmark A* using the index landmarks.py saved "
+                             "(unused when --tree-cache is set)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="parse people.csv and movies.csv in worker processes "
+                             "when there is no current snapshot")
+    args = parser.parse_args()
+
+    global fuzzy
+    fuzzy = args.fuzzy
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=True, progress=ingest.Progress(),
+                      parallel=args.parallel)
+    print("Data loaded.", file=sys.stderr)
+    degrees.use_tree_cache(args.tree_cache * 1024 * 1024)
+    if args.landmarks:
+        load_landmarks(args.directory)
+
+    processes = args.workers or None
+    if args.serve:
+        serve(args.serve)
+    elif args.input == "-":
+        run_stream(sys.stdin, sys.stdout, sys.stdin.isatty(),
+                   args.directory, processes)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            run_stream(f, sys.stdout, False, args.directory, processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import contextlib
+import io
+import random
+import sys
+import time
+
+import degrees
+
+
+def star_graph(n_people, stars_per_movie=4, seed=0):
+    """
+    Fills degrees.people / degrees.movies with a synthetic star graph of
+    n_people connected actors, plus one isolated actor that no search can
+    reach. Returns (source, unreachable) person ids.
+    """
+    rng = random.Random(seed)
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+
+    for i in range(n_people + 1):
+        degrees.people[str(i)] = {"name": f"Actor {i}", "birth": "", "movies": set()}
+
+    # Consecutive ids share a movie so everyone is connected, and each
+    # movie pulls in a few random extra stars
+    n_movies = max(1, n_people - 1)
+    for m in range(n_movies):
+        cast = {str(m), str(m + 1)}
+        cast.update(str(rng.randrange(n_people)) for _ in range(stars_per_movie - 2))
+        movie_id = f"m{m}"
+        degrees.movies[movie_id] = {"title": movie_id, "year": "", "stars": cast}
+        for person_id in cast:
+            degrees.people[person_id]["movies"].add(movie_id)
+
+    # The isolated actor gets a movie of their own
+    loner = str(n_people)
+    degrees.movies["loner"] = {"title": "loner", "year": "", "stars": {loner}}
+    degrees.people[loner]["movies"].add("loner")
+
+    return "0", loner
+
+
+def time_search(source, target, repeat=3, **kwargs):
+    """Best-of-repeat wall time of one shortest_path call, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            degrees.shortest_path(source, target, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def farthest(source):
+    """
+    Returns (person_id, degrees) for a person as far from source as any
+    reachable one, by BFS over degrees.people / degrees.movies.
+    """
+    distance = {source: 0}
+    frontier = [source]
+    while frontier:
+        following = []
+        for person_id in frontier:
+            for movie_id in degrees.people[person_id]["movies"]:
+                for star in degrees.movies[movie_id]["stars"]:
+                    if star not in distance:
+                        distance[star] = distance[person_id] + 1
+                        following.append(star)
+        if not following:
+            return frontier[0], distance[frontier[0]]
+        frontier = following
+    return source, 0
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 2000, 4000, 8000, 16000, 32000]
+
+    # An unreachable target forces BFS to exhaust the graph, so the time
+    # should grow in step with its size. Bidirectional search would stop
+    # as soon as the loner's side runs dry, so both searches are also
+    # timed against the farthest reachable person
+    print(f"{'people':>8} {'BFS (s)':>10} {'us/person':>10} "
+          f"{'far':>4} {'BFS far':>10} {'bidir far':>10}")
+    for n in sizes:
+        source, unreachable = star_graph(n)
+        bfs = time_search(source, unreachable)
+        far, distance = farthest(source)
+        bfs_far = time_search(source, far)
+        bidir_far = time_search(source, far, bidirectional=True)
+        print(f"{n:>8} {bfs:>10.4f} {bfs / n * 1e6:>10.2f} "
+              f"{distance:>4} {bfs_far:>10.4f} {bidir_far:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 import csv
 import sys
+import threading
 
-from util import Node, StackFrontier, QueueFrontier
+import ingest
+import snapshot
+from graph import GraphStore, TreeCache
+from landmarks import LazyLandmarks, astar_path
+from nameindex import NameIndex
+from util import Node, StackFrontier, QueueFrontier, join_paths
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +18,42 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed GraphStore, used in place of the dicts above when loaded
+store = None
 
-def load_data(directory):
+# Optional cache of single-source BFS trees over the store
+tree_cache = None
+
+# Approximate name lookup over the store, built on the first name that
+# has no exact match (see suggest_names)
+name_index = None
+name_index_lock = threading.Lock()
+
+# Landmark distance index for A* search over the store, see use_landmarks
+landmarks = None
+
+
+def load_data(directory, compact=False, cache=True, progress=None, parallel=False):
     """
     Load data from CSV files into memory.
+
+    With compact set, the data goes into a GraphStore instead of the
+    names/people/movies dicts, and the functions below run on it.
+    Unless cache is cleared, the store is memory-mapped from a snapshot
+    in directory, which is written on first load and rebuilt whenever
+    the CSVs change. The CSVs are streamed in chunks, reporting rows/s
+    and dropped rows to progress (an ingest.Progress) if given. With
+    parallel also set, people.csv and movies.csv are parsed at the same
+    time in worker processes whenever the CSVs have to be read.
     """
+    global store
+    if compact:
+        if cache:
+            store = snapshot.load_or_build(directory, progress=progress, parallel=parallel)
+        else:
+            store = GraphStore.from_csv(directory, progress, parallel)
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -46,10 +83,12 @@ def load_data(directory):
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                person = people[row["person_id"]]
+                movie = movies[row["movie_id"]]
             except KeyError:
-                pass
+                continue
+            person["movies"].add(row["movie_id"])
+            movie["stars"].add(row["person_id"])
 
 
 def main():
@@ -59,7 +98,7 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=True, progress=ingest.Progress())
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +108,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -78,30 +117,38 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_name(path[i][1])
+            person2 = person_name(path[i + 1][1])
+            movie = movie_title(path[i + 1][0])
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+    Set bidirectional to search from both ends and meet in the middle.
+    If given, stats["expanded"] counts the people the search expanded.
     """
+    if store is not None:
+        return compact_path(source, target, stats)
+
+    if bidirectional:
+        return bidirectional_path(source, target)
+
     print(f"Target: {target}\nSource: {source}")
 
     # Tracking variables
-    p_already_visited = []
-    m_already_visited = []
+    p_already_visited = set()
+    m_already_visited = set()
 
     # Initial Setup
     QF = QueueFrontier()
     init_node = Node(source, None, people[source]['movies'])
     QF.add(init_node)
-    p_already_visited.append(source)
+    p_already_visited.add(source)
 
     if source == target:
         return set([source, people[source]['movies'].pop()])
@@ -109,12 +156,14 @@ def shortest_path(source, target):
     while not QF.empty():
 
         cur_node = QF.remove()
-        
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + 1
+
         # Expand the node - Look at each movie and find which actor_id's we can acquire
         for mov_id in cur_node.action:
             if mov_id not in m_already_visited:
 
-                m_already_visited.append(mov_id)
+                m_already_visited.add(mov_id)
                 actors = movies[mov_id]['stars']
 
                 if target in actors:
@@ -122,11 +171,106 @@ def shortest_path(source, target):
 
                 for act_id in actors:
                     if act_id not in p_already_visited and act_id != cur_node.state:
-                        p_already_visited.append(act_id)
+                        p_already_visited.add(act_id)
                         QF.add(Node(act_id, cur_node, people[act_id]['movies']))
 
     return None
 
+def use_tree_cache(budget):
+    """
+    Answer compact queries from whole BFS trees, cached by source up to
+    budget bytes, so repeated sources are only searched once.
+    A budget of 0 goes back to one bidirectional search per query.
+    """
+    global tree_cache
+    tree_cache = TreeCache(store, budget) if budget else None
+
+
+def use_landmarks(directory, build=False):
+    """
+    Answer compact queries with A* over the landmark index saved in
+    directory, loading it on first use. With build set, a missing or
+    stale index is rebuilt; otherwise queries fall back to plain search.
+    """
+    global landmarks
+    landmarks = LazyLandmarks(store, directory, build)
+
+
+def compact_path(source, target, stats=None):
+    """
+    shortest_path over the loaded GraphStore, translating ids to and
+    from its dense indices.
+    """
+    source, target = store.person_index[source], store.person_index[target]
+    index = landmarks.get() if landmarks is not None else None
+    if tree_cache is not None:
+        path = tree_cache.shortest_path(source, target)
+    elif index is not None:
+        path = astar_path(store, index, source, target, stats)
+    else:
+        path = store.shortest_path(source, target, stats)
+    if path is None:
+        return None
+    return [(store.movie_ids[movie], store.person_ids[person])
+            for movie, person in path]
+
+
+def bidirectional_path(source, target):
+    """
+    Breadth-first search grown from both the source and the target.
+
+    Each round expands one full layer of whichever frontier is smaller,
+    so the two searches meet after exploring roughly the square root of
+    what a one-sided search would. Returns the same (movie_id, person_id)
+    path format as shortest_path, or None if the two are not connected.
+    """
+    if source == target:
+        return []
+
+    # Maps a person_id to the (movie_id, person_id) step that reached it,
+    # pointing back towards the side's root
+    parents = ({source: None}, {target: None})
+    frontiers = ([source], [target])
+    m_already_visited = (set(), set())
+
+    while frontiers[0] and frontiers[1]:
+
+        # Grow the cheaper side
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen, other = parents[side], parents[1 - side]
+        expanded = m_already_visited[side]
+
+        next_layer = []
+        meeting = None
+        for person_id in frontiers[side]:
+            for mov_id in people[person_id]["movies"]:
+                if mov_id in expanded:
+                    continue
+                expanded.add(mov_id)
+
+                for act_id in movies[mov_id]["stars"]:
+                    if act_id in seen:
+                        continue
+                    seen[act_id] = (mov_id, person_id)
+                    if act_id in other:
+                        meeting = act_id
+                        break
+                    next_layer.append(act_id)
+
+                if meeting is not None:
+                    break
+            if meeting is not None:
+                break
+
+        if meeting is not None:
+            return join_paths(parents[0], parents[1], meeting)
+
+        frontiers = (next_layer, frontiers[1]) if side == 0 \
+            else (frontiers[0], next_layer)
+
+    return None
+
+
 def complete_search(mov_id, node, target, source):
 
     save_path = []
@@ -150,25 +294,76 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
-    if len(person_ids) == 0:
-        return None
+    person_ids = ids_for_name(name)
+    if len(person_ids) == 1:
+        return person_ids[0]
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
     else:
-        return person_ids[0]
+        # Offer the closest names rather than giving up
+        if store is not None:
+            person_ids = suggest_names(name)
+        if len(person_ids) == 0:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+
+    for person_id in person_ids:
+        name = person_name(person_id)
+        birth = person_birth(person_id)
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
+def ids_for_name(name):
+    """Returns the list of person_ids with a given name."""
+    if store is not None:
+        return [store.person_ids[person]
+                for person in store.names.get(name.lower(), [])]
+    return list(names.get(name.lower(), set()))
+
+
+def build_name_index():
+    """Build the approximate name index over the loaded store."""
+    global name_index
+    name_index = NameIndex(store)
+
+
+def suggest_names(name, limit=5):
+    """
+    Returns up to limit person_ids whose names approximately match name,
+    best first. Builds the name index on first use, so loading stays
+    fast when every name matches exactly.
+    """
+    if name_index is None:
+        with name_index_lock:
+            if name_index is None:
+                build_name_index()
+    return [store.person_ids[person]
+            for person, _ in name_index.candidates(name, limit)]
+
+
+def person_name(person_id):
+    if store is not None:
+        return store.person_names[store.person_index[person_id]]
+    return people[person_id]["name"]
+
+
+def person_birth(person_id):
+    if store is not None:
+        return store.person_births[store.person_index[person_id]]
+    return people[person_id]["birth"]
+
+
+def movie_title(movie_id):
+    if store is not None:
+        return store.movie_titles[store.movie_index[movie_id]]
+    return movies[movie_id]["title"]
 
 
 def neighbors_for_person(person_id):
@@ -176,6 +371,10 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if store is not None:
+        return {(store.movie_ids[movie], store.person_ids[person])
+                for movie, person in store.neighbors(store.person_index[person_id])}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,552 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+import ingest
+from util import join_paths
+
+
+class StringTable():
+    """
+    Sequence of strings packed as offsets into a UTF-8 blob. A new table
+    can be appended to; one mapped from a snapshot is read-only.
+    """
+
+    def __init__(self, offsets=None, blob=None):
+        self.offsets = array("q", [0]) if offsets is None else offsets
+        self.blob = bytearray() if blob is None else blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def append(self, s):
+        self.blob += s.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+
+class SortedIndex():
+    """
+    Read-only mapping over sorted string keys. Key i maps to
+    values[offsets[i]], or with many set to the list
+    values[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, keys, offsets, values, many=False):
+        self.keys = keys
+        self.offsets = offsets
+        self.values = values
+        self.many = many
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return None
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def __getitem__(self, key):
+        i = self.find(key)
+        if i is None:
+            raise KeyError(key)
+        if self.many:
+            return list(self.values[self.offsets[i]:self.offsets[i + 1]])
+        return self.values[self.offsets[i]]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class TableIndex():
+    """
+    Maps each string in a StringTable to its position, by open addressing
+    over one int array instead of a dict of str keys and int values. A
+    string added again maps to its latest position, as in a dict.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.slots = array("i", [-1]) * 1024
+        self.size = 0
+
+    def find(self, key):
+        """Returns the slot holding key, or the empty slot it would go in."""
+        slots, table = self.slots, self.table
+        mask = len(slots) - 1
+        i = hash(key) & mask
+        while slots[i] >= 0 and table[slots[i]] != key:
+            i = (i + 1) & mask
+        return i
+
+    def get(self, key, default=None):
+        # find(), inlined: this runs once per id in stars.csv
+        slots, table = self.slots, self.table
+        mask = len(slots) - 1
+        i = hash(key) & mask
+        while True:
+            position = slots[i]
+            if position < 0:
+                return default
+            if table[position] == key:
+                return position
+            i = (i + 1) & mask
+
+    def add(self, key, position):
+        """Maps key, the table's string at position, to position."""
+        if 2 * (self.size + 1) > len(self.slots):
+            old = self.slots
+            self.slots = array("i", [-1]) * (2 * len(old))
+            for moved in old:
+                if moved >= 0:
+                    self.slots[self.find(self.table[moved])] = moved
+        i = self.find(key)
+        if self.slots[i] < 0:
+            self.size += 1
+        self.slots[i] = position
+
+    def positions(self):
+        """Returns the positions of the distinct strings, in table order."""
+        return sorted(position for position in self.slots if position >= 0)
+
+
+def pack_strings(strings):
+    """Returns (offsets, blob) for a StringTable holding strings."""
+    if isinstance(strings, StringTable):
+        return strings.offsets, strings.blob
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("q", [0])
+    total = 0
+    for data in encoded:
+        total += len(data)
+        offsets.append(total)
+    return offsets, b"".join(encoded)
+
+
+def pack_index(mapping, many=False):
+    """Returns (keys, offsets, values) sections for a SortedIndex."""
+    keys = sorted(mapping)
+    offsets = array("q", [0])
+    values = array("i")
+    for key in keys:
+        if many:
+            values.extend(mapping[key])
+        else:
+            values.append(mapping[key])
+        offsets.append(len(values))
+    return keys, offsets, values
+
+
+def sorted_index(mapping, many=False):
+    """
+    Returns a SortedIndex over packed strings holding the items of a
+    dict, or of a TableIndex from each string to its position.
+    """
+    if isinstance(mapping, TableIndex):
+        table = mapping.table
+        values = array("i", sorted(mapping.positions(), key=table.__getitem__))
+        keys = StringTable()
+        for position in values:
+            keys.append(table[position])
+        return SortedIndex(keys, array("q", range(len(values) + 1)), values)
+
+    keys, offsets, values = pack_index(mapping, many)
+    table = StringTable()
+    for key in keys:
+        table.append(key)
+    return SortedIndex(table, offsets, values, many)
+
+
+class GraphStore():
+    """
+    Compact, integer-indexed copy of the degrees dataset.
+
+    Person and movie ids are interned to dense ints in file order, and
+    the bipartite star graph is held as two CSR adjacency lists: the
+    movies of person p are person_movies[person_offsets[p]:person_offsets[p + 1]],
+    and the stars of movie m are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+    Strings are packed into StringTables, and once loaded, the lookups by
+    id and name are SortedIndexes over packed keys, as in a snapshot.
+    """
+
+    def __init__(self):
+        self.person_ids = StringTable()
+        self.person_names = StringTable()
+        self.person_births = StringTable()
+
+        self.movie_ids = StringTable()
+        self.movie_titles = StringTable()
+        self.movie_years = StringTable()
+
+        # Map ids to indices; TableIndexes while loading, until pack()
+        self.person_index = TableIndex(self.person_ids)
+        self.movie_index = TableIndex(self.movie_ids)
+
+        # Maps lowercased names to a list of person indices, filled by pack()
+        self.names = {}
+
+        self.person_offsets = array("q", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("q", [0])
+        self.movie_stars = array("i")
+
+        # Memory map backing the arrays above when loaded from a snapshot
+        self.snapshot = None
+
+        # Per-file rows, drops and seconds from from_csv
+        self.load_stats = {}
+
+    @classmethod
+    def from_csv(cls, directory, progress=None, parallel=False):
+        """
+        Stream people.csv, movies.csv and stars.csv into a new store.
+        Star rows naming an unknown person or movie are dropped, as in
+        degrees.load_data.
+
+        Per-file row counts, drops and timings go to progress (an
+        ingest.Progress, silent by default) and are kept in load_stats.
+        With parallel set, people.csv and movies.csv are parsed in
+        worker processes at the same time.
+        """
+        if progress is None:
+            progress = ingest.Progress(stream=None)
+        store = cls()
+        ingest.load_tables(store, directory, progress, parallel)
+        store.build_edges(*ingest.load_stars(store, directory, progress))
+        store.pack()
+        store.load_stats = progress.stats
+        return store
+
+    def add_person(self, person_id, name, birth):
+        index = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_index.add(person_id, index)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        index = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_index.add(movie_id, index)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        return index
+
+    def pack(self):
+        """
+        Swaps the id lookups filled while loading for SortedIndexes, and
+        indexes people by lowercased name the same way.
+        """
+        self.person_index = sorted_index(self.person_index)
+        self.movie_index = sorted_index(self.movie_index)
+
+        # Sorting people by name groups each name's people together,
+        # without a list per name
+        lowered = [name.lower() for name in self.person_names]
+        people = array("i", sorted(range(len(lowered)), key=lowered.__getitem__))
+        keys = StringTable()
+        offsets = array("q")
+        previous = None
+        for i, person in enumerate(people):
+            if lowered[person] != previous:
+                previous = lowered[person]
+                keys.append(previous)
+                offsets.append(i)
+        offsets.append(len(people))
+        self.names = SortedIndex(keys, offsets, people, many=True)
+
+    def build_edges(self, persons, movies):
+        """
+        Build both CSR adjacency lists from parallel arrays of person and
+        movie indices, ignoring duplicate edges.
+        """
+        n_people = len(self.person_ids)
+        n_movies = len(self.movie_ids)
+
+        # Counting sort the edges by person
+        person_offsets = array("q", bytes(8 * (n_people + 1)))
+        for p in persons:
+            person_offsets[p + 1] += 1
+        for p in range(n_people):
+            person_offsets[p + 1] += person_offsets[p]
+
+        cursor = array("q", person_offsets)
+        person_movies = array("i", bytes(4 * len(persons)))
+        for p, m in zip(persons, movies):
+            person_movies[cursor[p]] = m
+            cursor[p] += 1
+        del cursor
+
+        # Sort and dedupe each person's movies, compacting in place
+        movie_counts = array("q", bytes(8 * (n_movies + 1)))
+        end = 0
+        for p in range(n_people):
+            start, stop = person_offsets[p], person_offsets[p + 1]
+            person_offsets[p] = end
+            if stop - start > 1:
+                person_movies[end:end + (stop - start)] = array("i", sorted(person_movies[start:stop]))
+                previous = -1
+                for i in range(end, end + (stop - start)):
+                    m = person_movies[i]
+                    if m != previous:
+                        person_movies[end] = m
+                        end += 1
+                        movie_counts[m + 1] += 1
+                    previous = m
+            elif stop > start:
+                m = person_movies[end] = person_movies[start]
+                movie_counts[m + 1] += 1
+                end += 1
+        person_offsets[n_people] = end
+        del person_movies[end:]
+
+        for m in range(n_movies):
+            movie_counts[m + 1] += movie_counts[m]
+
+        # Counting sort the same edges by movie
+        movie_offsets = array("q", movie_counts)
+        movie_stars = array("i", bytes(4 * len(person_movies)))
+        for p in range(n_people):
+            for i in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[i]
+                movie_stars[movie_counts[m]] = p
+                movie_counts[m] += 1
+
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+    def movies_of(self, person):
+        """Returns the movie indices a person starred in."""
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """Returns the person indices starring in a movie."""
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) index pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                neighbors.add((movie, star))
+        return neighbors
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie, person) index pairs
+        that connect the source to the target, or None.
+
+        Bidirectional breadth-first search, expanding one full layer of
+        the smaller frontier at a time. If given, stats["expanded"] is
+        increased by the number of people expanded.
+        """
+        if source == target:
+            return []
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        parents = ({source: None}, {target: None})
+        frontiers = ([source], [target])
+        expanded = (set(), set())
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other = parents[side], parents[1 - side]
+            done = expanded[side]
+
+            next_layer = []
+            for person in frontiers[side]:
+                if stats is not None:
+                    stats["expanded"] = stats.get("expanded", 0) + 1
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    if movie in done:
+                        continue
+                    done.add(movie)
+
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        star = movie_stars[j]
+                        if star in seen:
+                            continue
+                        seen[star] = (movie, person)
+                        if star in other:
+                            return join_paths(parents[0], parents[1], star)
+                        next_layer.append(star)
+
+            frontiers = (next_layer, frontiers[1]) if side == 0 \
+                else (frontiers[0], next_layer)
+
+        return None
+
+    def bfs_tree(self, source):
+        """
+        Breadth-first search from source over the whole graph.
+        Returns a BFSTree holding every reachable person's distance and
+        parent step.
+        """
+        n_people = len(self.person_ids)
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        parent_person = array("i", [-1]) * n_people
+        parent_movie = array("i", [-1]) * n_people
+        distance = array("h", [-1]) * n_people
+        expanded = bytearray(len(self.movie_ids))
+
+        distance[source] = 0
+        layer = [source]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for person in layer:
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    if expanded[movie]:
+                        continue
+                    expanded[movie] = 1
+
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        star = movie_stars[j]
+                        if distance[star] < 0:
+                            distance[star] = depth
+                            parent_person[star] = person
+                            parent_movie[star] = movie
+                            next_layer.append(star)
+            layer = next_layer
+
+        return BFSTree(source, parent_person, parent_movie, distance)
+
+
+class BFSTree():
+    """
+    Shortest-path tree grown from one source person. Since the star
+    graph is undirected, it answers paths both to and from the source.
+    """
+
+    def __init__(self, source, parent_person, parent_movie, distance):
+        self.source = source
+        self.parent_person = parent_person
+        self.parent_movie = parent_movie
+        self.distance = distance
+
+    @property
+    def nbytes(self):
+        return sum(len(a) * a.itemsize
+                   for a in (self.parent_person, self.parent_movie, self.distance))
+
+    def distance_to(self, person):
+        """Returns the degrees between source and person, or None."""
+        distance = self.distance[person]
+        return None if distance < 0 else distance
+
+    def path_from(self, person):
+        """
+        Returns the (movie, person) steps leading from person to the
+        source, or None if they are not connected.
+        """
+        if self.distance[person] < 0:
+            return None
+        path = []
+        while person != self.source:
+            movie, person = self.parent_movie[person], self.parent_person[person]
+            path.append((movie, person))
+        return path
+
+    def path_to(self, target):
+        """
+        Returns the (movie, person) steps leading from the source to
+        target, or None if they are not connected.
+        """
+        if self.distance[target] < 0:
+            return None
+        path = []
+        person = target
+        while person != self.source:
+            path.append((self.parent_movie[person], person))
+            person = self.parent_person[person]
+        path.reverse()
+        return path
+
+
+class TreeCache():
+    """
+    Least-recently-used cache of BFSTrees keyed by source, holding at
+    most budget bytes of trees (but always the most recent one). Safe
+    to share between threads; trees are built outside the lock.
+    """
+
+    def __init__(self, store, budget=256 * 1024 * 1024):
+        self.store = store
+        self.budget = budget
+        self.trees = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, source):
+        """Returns the cached tree for source, marking it recently used, or None."""
+        with self.lock:
+            tree = self.trees.get(source)
+            if tree is not None:
+                self.hits += 1
+                self.trees.move_to_end(source)
+            return tree
+
+    def get(self, source):
+        """Returns the BFSTree rooted at source, building it if needed."""
+        tree = self.lookup(source)
+        if tree is not None:
+            return tree
+
+        tree = self.store.bfs_tree(source)
+        with self.lock:
+            self.misses += 1
+
+            # Another thread may have cached the same source meanwhile
+            replaced = self.trees.pop(source, None)
+            if replaced is not None:
+                self.nbytes -= replaced.nbytes
+            self.trees[source] = tree
+            self.nbytes += tree.nbytes
+            while self.nbytes > self.budget and len(self.trees) > 1:
+                _, evicted = self.trees.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return tree
+
+    def shortest_path(self, source, target):
+        """
+        GraphStore.shortest_path answered from a cached tree: the
+        target's if one is cached, otherwise the source's.
+        """
+        with self.lock:
+            tree = None
+            if source not in self.trees:
+                tree = self.trees.get(target)
+            if tree is not None:
+                self.hits += 1
+                self.trees.move_to_end(target)
+        if tree is not None:
+            return tree.path_from(source)
+        return self.get(source).path_to(target)
@@ -0,0 +1,199 @@
+import csv
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+# Rows handed over per chunk while streaming a CSV
+CHUNK_ROWS = 50000
+
+# Smallest step an EdgeBuffer grows by once its first guess runs out
+GROWTH_MIN = 1 << 16
+
+
+class Progress():
+    """
+    Tracks rows read and dropped per file, and reports the rate to
+    stream (if any) at most once per interval seconds.
+    """
+
+    def __init__(self, stream=sys.stderr, interval=1.0):
+        self.stream = stream
+        self.interval = interval
+        self.stats = {}
+        self.name = None
+
+    def start(self, name):
+        self.name = name
+        self.rows = 0
+        self.dropped = 0
+        self.began = self.reported = time.perf_counter()
+
+    def advance(self, rows, dropped=0):
+        self.rows += rows
+        self.dropped += dropped
+        now = time.perf_counter()
+        if self.stream is not None and now - self.reported >= self.interval:
+            self.reported = now
+            self.report(now)
+
+    def finish(self):
+        now = time.perf_counter()
+        self.stats[self.name] = {
+            "rows": self.rows,
+            "dropped": self.dropped,
+            "seconds": now - self.began,
+        }
+        if self.stream is not None:
+            self.report(now, done=True)
+
+    def record(self, name, rows, dropped, seconds):
+        """Adds the totals of a file read elsewhere, e.g. by a worker."""
+        self.start(name)
+        self.rows, self.dropped = rows, dropped
+        self.began -= seconds
+        self.finish()
+
+    def report(self, now, done=False):
+        elapsed = max(now - self.began, 1e-9)
+        status = "done" if done else "..."
+        print(f"{self.name}: {self.rows:,} rows ({self.rows / elapsed:,.0f} rows/s), "
+              f"{self.dropped:,} dropped {status}", file=self.stream)
+
+
+class EdgeBuffer():
+    """
+    Parallel person/movie int32 arrays, preallocated from an estimate of
+    the edge count and grown by a quarter at a time rather than doubled.
+    """
+
+    def __init__(self, estimate=0):
+        capacity = max(estimate, GROWTH_MIN)
+        self.persons = array("i", bytes(4 * capacity))
+        self.movies = array("i", bytes(4 * capacity))
+        self.size = 0
+
+    def append(self, person, movie):
+        if self.size == len(self.persons):
+            growth = bytes(4 * max(GROWTH_MIN, len(self.persons) // 4))
+            self.persons.frombytes(growth)
+            self.movies.frombytes(growth)
+        self.persons[self.size] = person
+        self.movies[self.size] = movie
+        self.size += 1
+
+    def trim(self):
+        """Drops the unused tail and returns (persons, movies)."""
+        del self.persons[self.size:]
+        del self.movies[self.size:]
+        return self.persons, self.movies
+
+
+def estimate_rows(path, sample=1 << 16):
+    """Guesses a CSV's row count from its size and the density of its head."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(sample)
+    lines = head.count(b"\n")
+    if not lines or len(head) == size:
+        return lines
+    return int(size / (len(head) / lines))
+
+
+def read_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the named columns of a CSV as lists of tuples, chunk_rows at
+    a time. Yields (chunk, malformed) where malformed counts short rows
+    that were skipped.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = [header.index(column) for column in columns]
+        pick = itemgetter(*positions)
+        width = max(positions) + 1
+
+        chunk = []
+        malformed = 0
+        for row in reader:
+            if len(row) < width:
+                malformed += 1
+                continue
+            chunk.append(pick(row))
+            if len(chunk) == chunk_rows:
+                yield chunk, malformed
+                chunk = []
+                malformed = 0
+        if chunk or malformed:
+            yield chunk, malformed
+
+
+def read_table(path, columns):
+    """
+    Reads the named columns of a whole CSV into one list per column.
+    Returns (columns, rows, malformed, seconds); used to parse files in
+    worker processes.
+    """
+    began = time.perf_counter()
+    lists = tuple([] for _ in columns)
+    rows = malformed = 0
+    for chunk, skipped in read_chunks(path, columns):
+        for values, row in zip(lists, zip(*chunk)):
+            values.extend(row)
+        rows += len(chunk) + skipped
+        malformed += skipped
+    return lists, rows, malformed, time.perf_counter() - began
+
+
+def load_tables(store, directory, progress, parallel=False):
+    """Fill store's people and movies from people.csv and movies.csv."""
+    tables = (
+        ("people.csv", ("id", "name", "birth"), store.add_person),
+        ("movies.csv", ("id", "title", "year"), store.add_movie),
+    )
+
+    if parallel:
+        with ProcessPoolExecutor(len(tables)) as pool:
+            futures = [pool.submit(read_table, os.path.join(directory, filename), columns)
+                       for filename, columns, _ in tables]
+            for (filename, _, add), future in zip(tables, futures):
+                lists, rows, malformed, seconds = future.result()
+                for values in zip(*lists):
+                    add(*values)
+                progress.record(filename, rows, malformed, seconds)
+        return
+
+    for filename, columns, add in tables:
+        progress.start(filename)
+        for chunk, malformed in read_chunks(os.path.join(directory, filename), columns):
+            for values in chunk:
+                add(*values)
+            progress.advance(len(chunk) + malformed, malformed)
+        progress.finish()
+
+
+def load_stars(store, directory, progress):
+    """
+    Streams stars.csv into an EdgeBuffer of (person, movie) indices,
+    dropping rows that name an unknown person or movie.
+    """
+    path = os.path.join(directory, "stars.csv")
+    person_index, movie_index = store.person_index, store.movie_index
+    edges = EdgeBuffer(estimate_rows(path))
+
+    progress.start("stars.csv")
+    for chunk, malformed in read_chunks(path, ("person_id", "movie_id")):
+        dropped = malformed
+        for person_id, movie_id in chunk:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is None or movie is None:
+                dropped += 1
+                continue
+            edges.append(person, movie)
+        progress.advance(len(chunk) + malformed, dropped)
+    progress.finish()
+
+    return edges.trim()
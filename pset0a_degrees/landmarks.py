@@ -0,0 +1,308 @@
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+
+import snapshot
+from util import join_paths
+
+MAGIC = b"DEGLMRK\0"
+VERSION = 1
+FILENAME = "degrees.landmarks"
+
+# Magic, format version, landmark count, then the JSON header length
+PREAMBLE = struct.Struct("<8sIII")
+
+
+class LandmarkIndex():
+    """
+    BFS distances from k landmark people to everyone, stored person-major
+    so distances[p * k:(p + 1) * k] are person p's distances to each
+    landmark, with -1 for unreachable.
+
+    Because the star graph is undirected, for any landmark l
+    |d(l, t) - d(l, p)| <= d(p, t), which gives A* an admissible bound.
+    """
+
+    def __init__(self, landmarks, distances, sources=None):
+        self.landmarks = landmarks
+        self.k = len(landmarks)
+        self.distances = distances
+        self.sources = sources
+
+        # Mapped file backing distances when loaded from disk
+        self.mapping = None
+
+    @classmethod
+    def build(cls, store, k=16, sources=None):
+        """
+        Choose k landmarks by farthest-point selection, starting from the
+        person in the most movies, and record their BFS distances.
+        """
+        n_people = len(store.person_ids)
+        if n_people == 0:
+            return cls([], array("h"), sources)
+        offsets = store.person_offsets
+        first = max(range(n_people), key=lambda p: offsets[p + 1] - offsets[p])
+
+        landmarks = []
+        columns = []
+        nearest = None
+        candidate = first
+        while len(landmarks) < k:
+            tree = store.bfs_tree(candidate)
+            landmarks.append(candidate)
+            columns.append(tree.distance)
+
+            # Next, whoever in the first landmark's component is farthest
+            # from every landmark chosen so far
+            if nearest is None:
+                nearest = array("h", tree.distance)
+            else:
+                for p in range(n_people):
+                    if 0 <= tree.distance[p] < nearest[p]:
+                        nearest[p] = tree.distance[p]
+            candidate = max(range(n_people), key=nearest.__getitem__)
+            if nearest[candidate] <= 0:
+                break
+
+        distances = array("h", bytes(2 * n_people * len(landmarks)))
+        for l, column in enumerate(columns):
+            distances[l::len(landmarks)] = column
+        return cls(landmarks, distances, sources)
+
+    def save(self, directory):
+        header = json.dumps({
+            "sources": self.sources,
+            "n_people": len(self.distances) // max(1, self.k),
+            "landmarks": self.landmarks,
+        }).encode("utf-8")
+        header += b" " * (-(PREAMBLE.size + len(header)) % 8)
+
+        path = os.path.join(directory, FILENAME)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, self.k, len(header)))
+            f.write(header)
+            f.write(self.distances.tobytes())
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, directory, n_people):
+        """
+        Map the index saved in directory, or return None if it is missing,
+        from another format version, or built from different CSVs.
+        """
+        path = os.path.join(directory, FILENAME)
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            magic, version, k, length = PREAMBLE.unpack_from(data)
+            header = None
+            if magic == MAGIC and version == VERSION:
+                header = json.loads(data[PREAMBLE.size:PREAMBLE.size + length])
+                if header["n_people"] != n_people or \
+                        not snapshot.is_current(header["sources"], directory):
+                    header = None
+        except (struct.error, ValueError, KeyError, OSError):
+            header = None
+        if header is None:
+            data.close()
+            return None
+
+        start = PREAMBLE.size + length
+        distances = memoryview(data)[start:start + 2 * k * n_people].cast("h")
+        index = cls(header["landmarks"], distances, header["sources"])
+        index.mapping = data
+        return index
+
+    def vector(self, person):
+        """Returns person's distance to each landmark."""
+        return self.distances[person * self.k:(person + 1) * self.k]
+
+    def lower_bound(self, person, target_vector):
+        """
+        Returns a lower bound on the degrees between person and the target
+        whose vector is given, or None if they cannot be connected.
+        """
+        bound = 0
+        for to_target, to_person in zip(target_vector, self.vector(person)):
+            if to_target < 0 or to_person < 0:
+                # Reachable from a landmark the other is not: different components
+                if to_target != to_person:
+                    return None
+                continue
+            gap = to_target - to_person
+            if gap < 0:
+                gap = -gap
+            if gap > bound:
+                bound = gap
+        return bound
+
+
+class LazyLandmarks():
+    """Loads (or with build set, builds) a LandmarkIndex on first use."""
+
+    def __init__(self, store, directory, build=False):
+        self.store = store
+        self.directory = directory
+        self.build = build
+        self.index = None
+        self.loaded = False
+
+    def get(self):
+        if not self.loaded:
+            self.loaded = True
+            self.index = LandmarkIndex.load(self.directory, len(self.store.person_ids))
+            if self.index is None and self.build:
+                self.index = build_index(self.store, self.directory)
+        return self.index
+
+
+def build_index(store, directory, k=16):
+    """Build a LandmarkIndex for directory and save it alongside the data."""
+    sources = snapshot.fingerprint(directory)
+    index = LandmarkIndex.build(store, k, sources)
+    try:
+        index.save(directory)
+    except OSError:
+        pass
+    return index
+
+
+def astar_path(store, index, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) index pairs that connect
+    the source to the target, or None, by A* search guided by the
+    landmark lower bounds. If given, stats["expanded"] is increased by
+    the number of people expanded.
+    """
+    if source == target:
+        return []
+
+    target_vector = index.vector(target)
+    bound = index.lower_bound(source, target_vector)
+    if bound is None:
+        return None
+
+    person_offsets, person_movies = store.person_offsets, store.person_movies
+    movie_offsets, movie_stars = store.movie_offsets, store.movie_stars
+
+    cost = {source: 0}
+    parents = {source: None}
+    bounds = {source: bound}
+    closed = set()
+
+    # Ties on estimated length go to the deeper person, nearer the target
+    heap = [(bound, 0, source)]
+    while heap:
+        _, depth, person = heapq.heappop(heap)
+        if person in closed:
+            continue
+        if person == target:
+            return join_paths(parents, {target: None}, target)
+        closed.add(person)
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + 1
+
+        reached = -depth + 1
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                star = movie_stars[j]
+                if star in closed or reached >= cost.get(star, reached + 1):
+                    continue
+                if star not in bounds:
+                    bounds[star] = index.lower_bound(star, target_vector)
+                if bounds[star] is None:
+                    continue
+                cost[star] = reached
+                parents[star] = (movie, person)
+                heapq.heappush(heap, (reached + bounds[star], -reached, star))
+
+    return None
+
+
+def benchmark(directory, queries, seed=0):
+    """
+    Compare people expanded and wall time per query for the QueueFrontier
+    BFS, bidirectional BFS and landmark A* on random connected pairs.
+    """
+    import degrees
+
+    degrees.load_data(directory)
+    degrees.load_data(directory, compact=True)
+    store = degrees.store
+    index = LazyLandmarks(store, directory, build=True).get()
+
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < queries and index.k:
+        source, target = rng.randrange(len(store.person_ids)), rng.randrange(len(store.person_ids))
+
+        # The dict-mode search pops from the person's movies when
+        # source == target, so identical pairs would corrupt the graph
+        if source == target:
+            continue
+        if index.lower_bound(source, index.vector(target)) is not None:
+            pairs.append((source, target))
+
+    def queue_frontier(source, target, stats):
+        degrees.store = None
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                degrees.shortest_path(store.person_ids[source], store.person_ids[target], stats=stats)
+        finally:
+            degrees.store = store
+
+    searches = [
+        ("QueueFrontier BFS", queue_frontier),
+        ("bidirectional BFS", store.shortest_path),
+        ("landmark A*", lambda s, t, stats: astar_path(store, index, s, t, stats)),
+    ]
+    print(f"{len(pairs)} queries, {index.k} landmarks")
+    for name, search in searches:
+        stats = {}
+        start = time.perf_counter()
+        for source, target in pairs:
+            search(source, target, stats)
+        elapsed = time.perf_counter() - start
+        expanded = stats.get("expanded", 0) / max(1, len(pairs))
+        print(f"{name:>20}: {expanded:10.1f} expanded/query "
+              f"{elapsed / max(1, len(pairs)) * 1000:8.3f} ms/query")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the landmark index for a degrees data directory."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", type=int, default=16, help="number of landmarks")
+    parser.add_argument("--bench", type=int, default=0, metavar="N",
+                        help="then compare searches on N random pairs")
+    args = parser.parse_args()
+
+    store = snapshot.load_or_build(args.directory)
+    start = time.perf_counter()
+    index = build_index(store, args.directory, args.k)
+    print(f"Built {index.k} landmarks in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+
+    if args.bench:
+        benchmark(args.directory, args.bench)
+
+
+if __name__ == "__main__":
+    main()
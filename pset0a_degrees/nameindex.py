@@ -0,0 +1,129 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Postings scanned per lookup before settling on the candidates found
+SCAN_LIMIT = 2000
+
+# Candidates rescored exactly after the cheap posting count
+SHORTLIST = 64
+
+# Trigram similarity below which a name is not worth suggesting
+MIN_SIMILARITY = 0.3
+
+
+def trigrams(name):
+    """Returns the set of padded character trigrams of a lowercased name."""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+    """
+    Approximate person-name lookup over a GraphStore.
+
+    Distinct lowercased names are kept sorted for prefix search, with an
+    inverted index from each trigram to the names containing it for
+    misspellings. Candidates are ranked by trigram similarity, then by
+    movie count, then by birth year.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+        # A snapshot's SortedIndex already holds its keys sorted
+        if isinstance(store.names, dict):
+            self.keys = sorted(store.names)
+        else:
+            self.keys = store.names.keys
+
+        postings = {}
+        for key_id in range(len(self.keys)):
+            for gram in trigrams(self.keys[key_id]):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("i")
+                posting.append(key_id)
+        self.postings = postings
+
+    def movie_count(self, person):
+        offsets = self.store.person_offsets
+        return offsets[person + 1] - offsets[person]
+
+    def birth_year(self, person):
+        birth = self.store.person_births[person]
+        return int(birth) if birth.isdigit() else None
+
+    def prefix(self, text, limit=10):
+        """Returns up to limit names starting with text, in sorted order."""
+        text = text.lower()
+        matches = []
+        i = bisect_left(self.keys, text)
+        while i < len(self.keys) and len(matches) < limit:
+            key = self.keys[i]
+            if not key.startswith(text):
+                break
+            matches.append(key)
+            i += 1
+        return matches
+
+    def similar(self, text, limit=10):
+        """
+        Returns up to limit (name, similarity) pairs for the names that
+        share the most trigrams with text, best first. Blank text
+        matches nothing.
+        """
+        text = text.lower().strip()
+        if not text:
+            return []
+        grams = trigrams(text)
+
+        # Count shared trigrams using the rarest postings first, which
+        # are both cheapest and most telling
+        counts = Counter()
+        scanned = 0
+        for posting in sorted((self.postings.get(gram, ()) for gram in grams), key=len):
+            if scanned and scanned + len(posting) > SCAN_LIMIT:
+                break
+            counts.update(posting)
+            scanned += len(posting)
+
+        scored = []
+        for key_id, _ in heapq.nlargest(SHORTLIST, counts.items(), key=lambda item: item[1]):
+            key = self.keys[key_id]
+            other = trigrams(key)
+            similarity = 2 * len(grams & other) / (len(grams) + len(other))
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, key))
+
+        # Names the text is a prefix of count as strong matches
+        for key in self.prefix(text, limit):
+            scored.append((max(0.5, len(text) / len(key)), key))
+
+        best = {}
+        for similarity, key in scored:
+            best[key] = max(similarity, best.get(key, 0))
+        return heapq.nlargest(limit, best.items(), key=lambda item: item[1])
+
+    def candidates(self, text, limit=5):
+        """
+        Returns up to limit (person, similarity) pairs for text, ranked
+        by similarity, then most movies, then earliest birth year.
+        """
+        if not text.strip():
+            return []
+        exact = self.store.names.get(text.lower(), [])
+        ranked = [(1.0, person) for person in exact]
+        if not ranked:
+            for key, similarity in self.similar(text, limit):
+                ranked.extend((similarity, person) for person in self.store.names[key])
+
+        def rank(item):
+            similarity, person = item
+            birth = self.birth_year(person)
+            return (-similarity, -self.movie_count(person),
+                    birth is None, birth or 0, person)
+
+        ranked.sort(key=rank)
+        return [(person, similarity) for similarity, person in ranked[:limit]]
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from graph import GraphStore, SortedIndex, StringTable, pack_strings, sorted_index
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Magic, format version, then the length of the JSON header that follows
+PREAMBLE = struct.Struct("<8sII")
+
+
+def fingerprint(directory, verify=False):
+    """
+    Returns the size and mtime of each source CSV, plus its SHA-256
+    when verify is set.
+    """
+    sources = {}
+    for filename in SOURCES:
+        path = os.path.join(directory, filename)
+        stat = os.stat(path)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        if verify:
+            entry["sha256"] = file_hash(path)
+        sources[filename] = entry
+    return sources
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save(store, directory, sources=None):
+    """
+    Write store to the snapshot file in directory, stamped with the
+    fingerprint of the CSVs it was built from.
+    """
+    sections = {}
+
+    def add_strings(name, strings):
+        sections[f"{name}.offsets"], sections[f"{name}.blob"] = pack_strings(strings)
+
+    for name in ("person_offsets", "person_movies", "movie_offsets", "movie_stars"):
+        sections[name] = getattr(store, name)
+    for name in ("person_ids", "person_names", "person_births",
+                 "movie_ids", "movie_titles", "movie_years"):
+        add_strings(name, getattr(store, name))
+
+    for name, index, many in (("person_index", store.person_index, False),
+                              ("movie_index", store.movie_index, False),
+                              ("names", store.names, True)):
+        if not isinstance(index, SortedIndex):
+            index = sorted_index(index, many)
+        add_strings(f"{name}.keys", index.keys)
+        sections[f"{name}.offsets"] = index.offsets
+        sections[f"{name}.values"] = index.values
+
+    # Lay the sections out back to back, each on an 8-byte boundary
+    layout = {}
+    position = 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array) else "B"
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [position, size, typecode]
+        position += -(-size // 8) * 8
+
+    header = json.dumps({
+        "sources": sources if sources is not None else fingerprint(directory, verify=True),
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-(PREAMBLE.size + len(header)) % 8)
+
+    path = os.path.join(directory, FILENAME)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            raw = data.tobytes() if isinstance(data, array) else data
+            f.write(raw)
+            f.write(b"\0" * (-len(raw) % 8))
+    os.replace(partial, path)
+
+
+def load(directory, verify=False):
+    """
+    Map the snapshot in directory into a GraphStore without copying it.
+
+    Returns None if there is no snapshot, it was written by another
+    format version, or any source CSV has changed since: a different
+    size or mtime, or with verify set, a different SHA-256.
+    """
+    path = os.path.join(directory, FILENAME)
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, length = PREAMBLE.unpack_from(data)
+        header = None
+        if magic == MAGIC and version == VERSION:
+            header = json.loads(data[PREAMBLE.size:PREAMBLE.size + length])
+            if not is_current(header["sources"], directory, verify):
+                header = None
+    except (struct.error, ValueError, KeyError, OSError):
+        header = None
+    if header is None:
+        data.close()
+        return None
+
+    view = memoryview(data)
+    start = PREAMBLE.size + length
+
+    def section(name):
+        position, size, typecode = header["sections"][name]
+        raw = view[start + position:start + position + size]
+        return raw if typecode == "B" else raw.cast(typecode)
+
+    def strings(name):
+        return StringTable(section(f"{name}.offsets"), section(f"{name}.blob"))
+
+    def index(name, many=False):
+        return SortedIndex(strings(f"{name}.keys"), section(f"{name}.offsets"),
+                           section(f"{name}.values"), many)
+
+    store = GraphStore()
+    for name in ("person_offsets", "person_movies", "movie_offsets", "movie_stars"):
+        setattr(store, name, section(name))
+    for name in ("person_ids", "person_names", "person_births",
+                 "movie_ids", "movie_titles", "movie_years"):
+        setattr(store, name, strings(name))
+    store.person_index = index("person_index")
+    store.movie_index = index("movie_index")
+    store.names = index("names", many=True)
+
+    # The views borrow the mapping, so it stays open as long as the store
+    store.snapshot = data
+    return store
+
+
+def is_current(recorded, directory, verify=False):
+    """Whether the CSVs in directory still match a recorded fingerprint."""
+    current = fingerprint(directory)
+    for filename in SOURCES:
+        then, now = recorded.get(filename), current[filename]
+        if then is None or then["size"] != now["size"] or then["mtime"] != now["mtime"]:
+            return False
+        if verify and then.get("sha256") != file_hash(os.path.join(directory, filename)):
+            return False
+    return True
+
+
+def load_or_build(directory, verify=False, progress=None, parallel=False):
+    """
+    Returns a GraphStore for directory, from its snapshot if current,
+    otherwise parsed from the CSVs (see GraphStore.from_csv for progress
+    and parallel) and snapshotted for next time.
+    """
+    store = load(directory, verify)
+    if store is not None:
+        return store
+
+    # Fingerprint first, so a CSV edited mid-parse leaves the snapshot stale
+    sources = fingerprint(directory, verify=True)
+    store = GraphStore.from_csv(directory, progress, parallel)
+    try:
+        save(store, directory, sources)
+    except OSError:
+        pass
+    return store
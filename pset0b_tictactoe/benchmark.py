@@ -0,0 +1,77 @@
+import time
+
+import tictactoe as ttt
+
+
+def positions(depth):
+    """Returns every distinct non-terminal board reachable in depth moves."""
+    boards = {ttt.board_key(ttt.initial_state()): ttt.initial_state()}
+    for _ in range(depth):
+        following = {}
+        for board in boards.values():
+            if ttt.terminal(board):
+                continue
+            for move in ttt.actions(board):
+                child = ttt.result(board, move)
+                following[ttt.board_key(child)] = child
+        boards = following
+    return [board for board in boards.values() if not ttt.terminal(board)]
+
+
+def tree_size(board, p):
+    """Counts the boards a plain minimax search visits, with no table or pruning."""
+    if ttt.line_winner(board) is not None:
+        return 1
+    nodes = 1
+    for i, j in ttt.MOVE_ORDER:
+        if board[i][j] is ttt.EMPTY:
+            board[i][j] = p
+            nodes += tree_size(board, ttt.O if p == ttt.X else ttt.X)
+            board[i][j] = ttt.EMPTY
+    return nodes
+
+
+def live_minimax(board):
+    return ttt.minimax(board, use_book=False)
+
+
+def run(search, board):
+    """Returns (action, nodes searched, seconds) for one cold search."""
+    ttt.clear_table()
+    ttt.search_stats["nodes"] = 0
+    start = time.perf_counter()
+    action = search(board)
+    return action, ttt.search_stats["nodes"], time.perf_counter() - start
+
+
+def main():
+    # Nodes searched from cold for every distinct position a few moves in:
+    # the whole minimax tree, minimax with its transposition table, and
+    # alpha-beta with move ordering
+    print(f"{'moves in':>8} {'boards':>6} {'full tree':>10} {'minimax':>8} {'alphabeta':>10} "
+          f"{'minimax s':>10} {'alphabeta s':>12}")
+    for depth in range(0, 6):
+        boards = positions(depth)
+        totals = [0, 0, 0.0, 0.0]
+        full = sum(tree_size([row[:] for row in board], ttt.player(board)) for board in boards)
+        for board in boards:
+            move, nodes, seconds = run(live_minimax, board)
+            pruned_move, pruned_nodes, pruned_seconds = run(ttt.alphabeta, board)
+
+            # Ties between equally good moves may break differently,
+            # but both must lead to the same outcome
+            expected = ttt.best_move(ttt.result(board, move))
+            actual = ttt.best_move(ttt.result(board, pruned_move))
+            assert expected == actual, (board, move, pruned_move)
+
+            totals[0] += nodes
+            totals[1] += pruned_nodes
+            totals[2] += seconds
+            totals[3] += pruned_seconds
+
+        print(f"{depth:>8} {len(boards):>6} {full:>10} {totals[0]:>8} {totals[1]:>10} "
+              f"{totals[2]:>10.4f} {totals[3]:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
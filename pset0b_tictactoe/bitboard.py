@@ -0,0 +1,194 @@
+"""
+Tic Tac Toe Player on bitboards
+
+Each player's marks are a 9-bit integer, bit 3 * i + j standing for
+cell (i, j). The functions taking a board keep the list-of-lists API of
+tictactoe.py, so runner.py can use this module in its place; the *_bits
+functions work on (x, o) pairs directly.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# The 8 winning lines as masks over the 9 cells
+WIN_MASKS = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+]
+
+# Center first, then corners, then edges
+MOVE_ORDER = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+POPCOUNT = [bin(bits).count("1") for bits in range(1 << 9)]
+
+# (x, o) -> minimax score, shared by every search in the process
+table = {}
+
+
+def to_bits(board):
+    """
+    Returns the (x, o) bitboards for a list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for a pair of bitboards.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def has_line(bits):
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def player_bits(x, o):
+    return X if POPCOUNT[x] <= POPCOUNT[o] else O
+
+
+def winner_bits(x, o):
+    if has_line(x):
+        return X
+    if has_line(o):
+        return O
+    return None
+
+
+def terminal_bits(x, o):
+    return (x | o) == FULL or has_line(x) or has_line(o)
+
+
+def score_bits(x, o):
+    """
+    Returns the minimax score: 1 if X wins with optimal play,
+    -1 if O does, 0 for a tie.
+    """
+    key = (x, o)
+    if key in table:
+        return table[key]
+
+    if has_line(x):
+        value = 1
+    elif has_line(o):
+        value = -1
+    elif (x | o) == FULL:
+        value = 0
+    elif POPCOUNT[x] <= POPCOUNT[o]:
+        value = max(score_bits(x | 1 << cell, o)
+                    for cell in MOVE_ORDER if not (x | o) >> cell & 1)
+    else:
+        value = min(score_bits(x, o | 1 << cell)
+                    for cell in MOVE_ORDER if not (x | o) >> cell & 1)
+
+    table[key] = value
+    return value
+
+
+def best_cell(x, o):
+    """
+    Returns the optimal cell index for the player to move, or None.
+    """
+    if terminal_bits(x, o):
+        return None
+
+    # Score every move from the mover's point of view
+    sign = 1 if player_bits(x, o) == X else -1
+    best = None
+    best_score = None
+    for cell in MOVE_ORDER:
+        if (x | o) >> cell & 1:
+            continue
+        if sign == 1:
+            value = score_bits(x | 1 << cell, o)
+        else:
+            value = -score_bits(x, o | 1 << cell)
+        if best_score is None or value > best_score:
+            best, best_score = cell, value
+    return best
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return to_board(0, 0)
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    return player_bits(*to_bits(board))
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    x, o = to_bits(board)
+    if terminal_bits(x, o):
+        return None
+    return {divmod(cell, 3) for cell in range(9) if not (x | o) >> cell & 1}
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    x, o = to_bits(board)
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3) or (x | o) >> (3 * i + j) & 1:
+        raise KeyError("Incorrect Action")
+
+    if player_bits(x, o) == X:
+        x |= 1 << (3 * i + j)
+    else:
+        o |= 1 << (3 * i + j)
+    return to_board(x, o)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    return winner_bits(*to_bits(board))
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return terminal_bits(*to_bits(board))
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    won = winner(board)
+    return 1 if won == X else -1 if won == O else 0
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    cell = best_cell(*to_bits(board))
+    return None if cell is None else divmod(cell, 3)
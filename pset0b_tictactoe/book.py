@@ -0,0 +1,61 @@
+import sys
+
+import bitboard
+import tictactoe as ttt
+
+
+def positions():
+    """
+    Returns canonical key -> board for every position reachable from
+    the empty board, one per class of rotations and reflections.
+    """
+    found = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = ttt.board_key(board)
+        if key in found:
+            continue
+        found[key] = board
+        if not ttt.terminal(board):
+            for move in ttt.actions(board):
+                stack.append(ttt.result(board, move))
+    return found
+
+
+def build():
+    """
+    Returns canonical key -> optimal cell index (in the key's own
+    orientation) for every non-terminal position.
+    """
+    entries = {}
+    for key in positions():
+        x = o = 0
+        for n, mark in enumerate(key):
+            if mark == ttt.X:
+                x |= 1 << n
+            elif mark == ttt.O:
+                o |= 1 << n
+        cell = bitboard.best_cell(x, o)
+        if cell is not None:
+            entries[key] = cell
+    return entries
+
+
+def write(entries, path):
+    with open(path, "w") as f:
+        f.write("# tictactoe opening book: canonical board, optimal cell (0-8)\n")
+        for key in sorted(entries):
+            f.write(f"{key} {entries[key]}\n")
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else ttt.BOOK_FILE
+    found = positions()
+    entries = build()
+    write(entries, path)
+    print(f"{len(found)} distinct positions, {len(entries)} with a move, written to {path}")
+
+
+if __name__ == "__main__":
+    main()
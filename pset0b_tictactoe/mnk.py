@@ -0,0 +1,335 @@
+"""
+m,n,k-game Player
+
+Tic-tac-toe generalised to an m x n board won by k in a row. Boards are
+lists of rows of X / O / EMPTY like tictactoe.py. Wins are checked only
+around the last move, and the AI runs iterative-deepening alpha-beta
+under a wall-clock budget, scoring unfinished boards heuristically.
+"""
+
+import math
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won game; wins found sooner score higher
+WIN = 10 ** 12
+
+# Row/column steps for the 4 line directions
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# Nodes searched and depth completed by the latest best_action call
+search_stats = {"nodes": 0, "depth": 0}
+
+
+class TimeUp(Exception):
+    pass
+
+
+def initial_state(m=3, n=3):
+    """
+    Returns an empty m x n board.
+    """
+    return [[EMPTY] * n for _ in range(m)]
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    marks = sum(cell is not EMPTY for row in board for cell in row)
+    xs = sum(cell == X for row in board for cell in row)
+    return X if xs <= marks - xs else O
+
+
+def actions(board):
+    """
+    Returns the empty cells, nearest the center first.
+    """
+    m, n = len(board), len(board[0])
+    return [cell for cell in central_order(m, n) if board[cell[0]][cell[1]] is EMPTY]
+
+
+def central_order(m, n):
+    """Returns every cell of an m x n board, nearest the center first."""
+    middle_i, middle_j = (m - 1) / 2, (n - 1) / 2
+    return sorted(((i, j) for i in range(m) for j in range(n)),
+                  key=lambda cell: (abs(cell[0] - middle_i) + abs(cell[1] - middle_j), cell))
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i < len(board) and 0 <= j < len(board[0])) or board[i][j] is not EMPTY:
+        raise KeyError("Incorrect Action")
+    following = [row[:] for row in board]
+    following[i][j] = player(board)
+    return following
+
+
+def wins_at(board, i, j, k):
+    """
+    Returns True if the mark at (i, j) is part of k in a row. Only the
+    4 lines through (i, j) are scanned, so this is the check to make
+    after each move rather than rescanning the whole board.
+    """
+    mark = board[i][j]
+    m, n = len(board), len(board[0])
+    for di, dj in DIRECTIONS:
+        run = 1
+        for sign in (1, -1):
+            r, c = i + sign * di, j + sign * dj
+            while 0 <= r < m and 0 <= c < n and board[r][c] == mark:
+                run += 1
+                r += sign * di
+                c += sign * dj
+        if run >= k:
+            return True
+    return False
+
+
+def winner(board, k=3):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell is not EMPTY and wins_at(board, i, j, k):
+                return cell
+    return None
+
+
+def terminal(board, k=3):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return winner(board, k) is not None or all(
+        cell is not EMPTY for row in board for cell in row
+    )
+
+
+def window_score(board, i, j, di, dj, k):
+    """
+    Returns the heuristic value for X of the length-k window starting at
+    (i, j) in direction (di, dj): 4 ** (marks) if only X has marks in
+    it, minus that if only O does, and 0 otherwise.
+    """
+    owner = None
+    count = 0
+    for step in range(k):
+        cell = board[i + step * di][j + step * dj]
+        if cell is EMPTY:
+            continue
+        if owner is None:
+            owner = cell
+        elif cell != owner:
+            return 0
+        count += 1
+    if owner is None:
+        return 0
+    return 4 ** count if owner == X else -4 ** count
+
+
+def score_around(board, i, j, k):
+    """
+    Returns the summed window_score of every window through (i, j): the
+    only windows a move at (i, j) can change.
+    """
+    m, n = len(board), len(board[0])
+    total = 0
+    for di, dj in DIRECTIONS:
+        for back in range(k):
+            start_i, start_j = i - back * di, j - back * dj
+            end_i, end_j = start_i + (k - 1) * di, start_j + (k - 1) * dj
+            if 0 <= start_i < m and 0 <= end_i < m \
+                    and 0 <= start_j < n and 0 <= end_j < n:
+                total += window_score(board, start_i, start_j, di, dj, k)
+    return total
+
+
+def evaluate(board, k, p):
+    """
+    Heuristic score of an unfinished board for p: every length-k window
+    still open to only one player counts 4 ** (its marks) for them.
+    The search keeps this up to date move by move with score_around
+    rather than calling it at every leaf.
+    """
+    m, n = len(board), len(board[0])
+
+    # Only windows holding a mark score anything
+    windows = set()
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell is EMPTY:
+                continue
+            for di, dj in DIRECTIONS:
+                for back in range(k):
+                    start_i, start_j = i - back * di, j - back * dj
+                    end_i, end_j = start_i + (k - 1) * di, start_j + (k - 1) * dj
+                    if 0 <= start_i < m and 0 <= end_i < m \
+                            and 0 <= start_j < n and 0 <= end_j < n:
+                        windows.add((start_i, start_j, di, dj))
+
+    total = sum(window_score(board, i, j, di, dj, k) for i, j, di, dj in windows)
+    return total if p == X else -total
+
+
+def candidates(board, radius):
+    """
+    Returns the empty cells within radius of a mark, nearest the center
+    first, or just the center cell of an empty board. Cells far from
+    every mark share no window with them, so they are left out of the
+    search; on a 3x3 board with radius 2 nothing is left out.
+    """
+    m, n = len(board), len(board[0])
+    near = set()
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell is not EMPTY:
+                near.update(neighbors(board, i, j, radius))
+    if not near:
+        return [cell for cell in central_order(m, n) if board[cell[0]][cell[1]] is EMPTY][:1]
+    middle_i, middle_j = (m - 1) / 2, (n - 1) / 2
+    return sorted(near, key=lambda cell: (abs(cell[0] - middle_i) + abs(cell[1] - middle_j), cell))
+
+
+def neighbors(board, i, j, radius):
+    """Returns the empty cells within radius of (i, j)."""
+    m, n = len(board), len(board[0])
+    return [(r, c)
+            for r in range(max(0, i - radius), min(m, i + radius + 1))
+            for c in range(max(0, j - radius), min(n, j + radius + 1))
+            if board[r][c] is EMPTY]
+
+
+def extend(moves, board, i, j, radius):
+    """
+    Returns the candidate moves after a move at (i, j): the empty cells
+    around it first, then the rest of moves.
+    """
+    local = neighbors(board, i, j, radius)
+    seen = set(local)
+    return local + [cell for cell in moves if cell not in seen and cell != (i, j)]
+
+
+def negamax(board, moves, p, depth, alpha, beta, ply, empty, k, deadline, total, radius):
+    """
+    Returns the score of the board for p, who is to move, searching
+    depth more plies within the (alpha, beta) window. total is the
+    board's evaluate() score for X, updated around each move.
+    """
+    search_stats["nodes"] += 1
+    if deadline is not None and time.perf_counter() > deadline:
+        raise TimeUp()
+
+    if depth == 0:
+        return total if p == X else -total
+
+    other = O if p == X else X
+    best = -math.inf
+    for i, j in moves:
+        before = score_around(board, i, j, k)
+        board[i][j] = p
+        if wins_at(board, i, j, k):
+            value = WIN - ply
+        elif empty == 1:
+            value = 0
+        else:
+            change = score_around(board, i, j, k) - before
+            following = extend(moves, board, i, j, radius) if depth > 1 else None
+            value = -negamax(board, following, other, depth - 1, -beta, -alpha,
+                             ply + 1, empty - 1, k, deadline, total + change, radius)
+        board[i][j] = EMPTY
+
+        if value > best:
+            best = value
+        if best > alpha:
+            alpha = best
+        if alpha >= beta:
+            break
+
+    # Every cell near the marks is taken; score the board as it stands
+    if best == -math.inf:
+        return total if p == X else -total
+    return best
+
+
+def best_action(board, k=3, budget=None):
+    """
+    Returns the best action found for the current player on the board.
+
+    Searches one ply deeper at a time until the whole game tree is
+    searched, a forced result is found, or budget seconds have passed,
+    and returns the best move of the deepest search that finished.
+    Depth 1 always runs to completion, so even a tiny budget returns a
+    searched move. Without a budget the search always runs to the end
+    of the game.
+    """
+    if terminal(board, k):
+        return None
+
+    started = time.perf_counter()
+    deadline = None if budget is None else started + budget
+    work = [row[:] for row in board]
+    p = player(board)
+    other = O if p == X else X
+    m, n = len(board), len(board[0])
+    empty = sum(cell is EMPTY for row in board for cell in row)
+
+    # Only cells that can share a window with a mark are searched
+    radius = min(k - 1, 2)
+    total = evaluate(work, k, X)
+
+    search_stats["nodes"] = 0
+    search_stats["depth"] = 0
+    moves = candidates(work, radius)
+    best = moves[0]
+
+    for depth in range(1, empty + 1):
+        try:
+            alpha = -math.inf
+            found = None
+            for i, j in moves:
+                before = score_around(work, i, j, k)
+                work[i][j] = p
+                if wins_at(work, i, j, k):
+                    value = WIN
+                elif empty == 1:
+                    value = 0
+                else:
+                    change = score_around(work, i, j, k) - before
+                    following = extend(moves, work, i, j, radius) if depth > 1 else None
+                    value = -negamax(work, following, other, depth - 1, -math.inf, -alpha,
+                                     1, empty - 1, k, None if depth == 1 else deadline,
+                                     total + change, radius)
+                work[i][j] = EMPTY
+                if found is None or value > alpha:
+                    alpha, found = value, (i, j)
+        except TimeUp:
+            break
+
+        best = found
+        search_stats["depth"] = depth
+
+        # Search the best move first next time, and stop once the
+        # outcome is forced or the next depth has no time left
+        moves.remove(best)
+        moves.insert(0, best)
+        if abs(alpha) > WIN - m * n - 1:
+            break
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+    return best
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on a 3x3
+    tic-tac-toe board, searched to the end of the game.
+    """
+    return best_action(board, 3)
@@ -0,0 +1,100 @@
+import argparse
+import random
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def engines(use_book):
+    return {
+        "minimax": lambda board: ttt.minimax(board, use_book=use_book),
+        "alphabeta": ttt.alphabeta,
+    }
+
+
+def play(x_move, o_move, moves_log):
+    """
+    Plays one game from the empty board. Each *_move maps a board to an
+    action; AI moves are timed into moves_log as (seconds, nodes).
+    Returns the winner, or None for a tie.
+    """
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        mover = x_move if ttt.player(board) == ttt.X else o_move
+        if mover is None:
+            move = random.choice(sorted(ttt.actions(board)))
+        else:
+            ttt.search_stats["nodes"] = 0
+            start = time.perf_counter()
+            move = mover(board)
+            moves_log.append((time.perf_counter() - start, ttt.search_stats["nodes"]))
+        board = ttt.result(board, move)
+    return ttt.winner(board)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play headless tic-tac-toe games and report engine speed."
+    )
+    parser.add_argument("--games", "-n", type=int, default=1000,
+                        help="games per matchup")
+    parser.add_argument("--engine", choices=["minimax", "alphabeta"], default="minimax")
+    parser.add_argument("--no-book", action="store_true",
+                        help="search every move instead of using the opening book")
+    parser.add_argument("--cold", action="store_true",
+                        help="clear the transposition table before every game")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    ai = engines(not args.no_book)[args.engine]
+
+    # Which side the AI must never lose as, for each matchup
+    matchups = [
+        ("AI vs AI", ai, ai, None),
+        ("AI (X) vs random", ai, None, ttt.X),
+        ("random vs AI (O)", None, ai, ttt.O),
+    ]
+
+    failures = 0
+    print(f"engine: {args.engine}, book: {not args.no_book}, cold: {args.cold}")
+    for name, x_move, o_move, ai_side in matchups:
+        moves_log = []
+        outcomes = {ttt.X: 0, ttt.O: 0, None: 0}
+        start = time.perf_counter()
+        for _ in range(args.games):
+            if args.cold:
+                ttt.clear_table()
+            outcomes[play(x_move, o_move, moves_log)] += 1
+        elapsed = time.perf_counter() - start
+
+        latencies = [seconds * 1000 for seconds, _ in moves_log]
+        nodes = sum(count for _, count in moves_log) / max(1, len(moves_log))
+        print(f"{name}: {args.games / elapsed:,.0f} games/s, "
+              f"X {outcomes[ttt.X]} / O {outcomes[ttt.O]} / tie {outcomes[None]}, "
+              f"{nodes:,.1f} nodes/move, move p50 {percentile(latencies, 0.5):.3f} ms "
+              f"p99 {percentile(latencies, 0.99):.3f} ms")
+
+        # Optimal play never loses: self-play always ties, and the AI
+        # never loses to a random opponent
+        if ai_side is None:
+            lost = outcomes[ttt.X] + outcomes[ttt.O]
+        else:
+            lost = outcomes[ttt.O if ai_side == ttt.X else ttt.X]
+        if lost:
+            print(f"    FAIL: optimal play lost {lost} game(s)")
+            failures += 1
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Tic Tac Toe Player
 
 import math
 import copy
+import os
 
 X = "X"
 O = "O"
@@ -127,7 +128,116 @@ def utility(board):
             
     return 0
 
+# Transposition table: canonical board key -> best_move score.
+# Lives for the whole process, so later searches reuse earlier ones
+table = {}
+table_stats = {"hits": 0, "misses": 0}
+
+# Boards visited by score_board and alphabeta_score, for benchmarking
+search_stats = {"nodes": 0}
+
+# The board's 8 rotations and reflections, as permutations of cell indices
+SYMMETRIES = []
+for transform in [
+    lambda i, j: (i, j), lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j), lambda i, j: (2 - i, j),
+    lambda i, j: (j, i), lambda i, j: (2 - j, 2 - i),
+]:
+    SYMMETRIES.append(tuple(
+        3 * transform(i, j)[0] + transform(i, j)[1]
+        for i in range(3) for j in range(3)
+    ))
+
+
+def canonical(board):
+    """
+    Returns (key, symmetry): the smallest of the board's 8 transformed
+    cell strings, and the symmetry producing it. Position n of the key
+    holds cell symmetry[n] of the board.
+    """
+    cells = "".join(cell or "-" for row in board for cell in row)
+    return min(("".join(cells[k] for k in symmetry), symmetry)
+               for symmetry in SYMMETRIES)
+
+
+def board_key(board):
+    """
+    Returns a hashable key shared by every board equivalent
+    to this one under rotation and reflection.
+    """
+    return canonical(board)[0]
+
+
+# Precomputed optimal moves, see book.py
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.txt")
+book = None
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Returns the opening book as canonical key -> cell index in that key,
+    or an empty book if the file is missing.
+    """
+    entries = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                key, cell = line.split()
+                entries[key] = int(cell)
+    except OSError:
+        pass
+    return entries
+
+
+def book_move(board):
+    """
+    Returns the opening book's optimal action for the board,
+    or None if it has no entry.
+    """
+    global book
+    if book is None:
+        book = load_book()
+
+    key, symmetry = canonical(board)
+    cell = book.get(key)
+    if cell is None:
+        return None
+    return divmod(symmetry[cell], 3)
+
+
+def table_info():
+    """
+    Returns transposition table hits, misses and size.
+    """
+    return dict(table_stats, size=len(table))
+
+
+def clear_table():
+    table.clear()
+    table_stats["hits"] = 0
+    table_stats["misses"] = 0
+
+
 def best_move(board):
+    """
+    Returns the minimax score of the board: 1 if X wins with
+    optimal play, -1 if O does, 0 for a tie.
+    """
+    key = board_key(board)
+    if key in table:
+        table_stats["hits"] += 1
+        return table[key]
+
+    table_stats["misses"] += 1
+    table[key] = score_board(board)
+    return table[key]
+
+
+def score_board(board):
+    search_stats["nodes"] += 1
 
     if terminal(board):
         return  1 if winner(board) == X        \
@@ -155,11 +265,18 @@ def best_move(board):
 
         return min(curscore, best)
 
-def minimax(board):
+def minimax(board, use_book=True):
     """
     Returns the optimal action for the current player on the board.
+    Unless use_book is cleared, boards in the opening book are answered
+    from it, and only the rest are searched.
     """
 
+    if use_book:
+        move = book_move(board)
+        if move is not None:
+            return move
+
     wins = winner(board)
     if wins:
         return 1 if player(board) == X else -1 if player(board) == O else None
@@ -194,6 +311,97 @@ def minimax(board):
     return best
 
 
+# Center first, then corners, then edges: the squares on most lines
+# tend to be the best moves, which makes alpha-beta cut off sooner
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+LINES = [
+    [(0, 0), (0, 1), (0, 2)], [(1, 0), (1, 1), (1, 2)], [(2, 0), (2, 1), (2, 2)],
+    [(0, 0), (1, 0), (2, 0)], [(0, 1), (1, 1), (2, 1)], [(0, 2), (1, 2), (2, 2)],
+    [(0, 0), (1, 1), (2, 2)], [(0, 2), (1, 1), (2, 0)],
+]
+
+
+def line_winner(board):
+    """
+    Returns the player holding a full line, if any,
+    without building the contiguous() trace.
+    """
+    for (a, b), (c, d), (e, f) in LINES:
+        mark = board[a][b]
+        if mark is not EMPTY and mark == board[c][d] == board[e][f]:
+            return mark
+    return None
+
+
+def alphabeta(board):
+    """
+    Returns the optimal action for the current player on the board,
+    like minimax, using alpha-beta pruning with center/corner-first
+    move ordering.
+    """
+    if line_winner(board) is not None:
+        return None
+
+    p = player(board)
+    work = [row[:] for row in board]
+    alpha, beta = -2, 2
+    best = None
+
+    for i, j in MOVE_ORDER:
+        if work[i][j] is not EMPTY:
+            continue
+        work[i][j] = p
+        value = alphabeta_score(work, O if p == X else X, alpha, beta)
+        work[i][j] = EMPTY
+
+        if p == X and value > alpha:
+            alpha, best = value, (i, j)
+        elif p == O and value < beta:
+            beta, best = value, (i, j)
+
+        # Nothing beats a forced win
+        if value == score[p]:
+            break
+
+    return best
+
+
+def alphabeta_score(board, p, alpha, beta):
+    """
+    Returns the minimax score of the board with p to move, searching
+    within the (alpha, beta) window. Plays moves on board in place and
+    undoes them, so no boards are copied.
+    """
+    search_stats["nodes"] += 1
+
+    won = line_winner(board)
+    if won is not None:
+        return score[won]
+
+    moved = False
+    for i, j in MOVE_ORDER:
+        if board[i][j] is not EMPTY:
+            continue
+        moved = True
+        board[i][j] = p
+        value = alphabeta_score(board, O if p == X else X, alpha, beta)
+        board[i][j] = EMPTY
+
+        if p == X:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            break
+
+    # A full board with no line is a tie
+    if not moved:
+        return 0
+    return alpha if p == X else beta
+
+
 def contiguous(board):
     """
     Player heuristics of the board's current configuration
@@ -0,0 +1,66 @@
+import argparse
+import time
+
+import logic
+from generate import generate
+from logic import KnowledgeBase, model_check
+
+METHODS = ["enumerate", "compiled", "vectorized", "parallel", "sat", "kb"]
+
+
+def solve(method, knowledge, symbols, stats):
+    """Asks whether knowledge entails each symbol; returns the answers."""
+    if method == "kb":
+        return KnowledgeBase(knowledge).ask(*symbols, stats=stats)
+    return [model_check(knowledge, symbol, method=method, stats=stats)
+            for symbol in symbols]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time entailment backends on generated knights-and-knaves puzzles."
+    )
+    parser.add_argument("sizes", nargs="*", type=int,
+                        default=[2, 3, 4, 5, 6, 7, 8, 10, 12, 16, 24, 32, 64],
+                        help="characters per puzzle")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--statements", type=int, default=1,
+                        help="claims each character makes")
+    parser.add_argument("--budget", type=float, default=10.0,
+                        help="stop running a method once a size takes this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'method':>10} {'N':>4} {'symbols':>7} {'models':>14} "
+          f"{'conflicts':>9} {'seconds':>9}")
+    slow = set()
+    for n in args.sizes:
+        knowledge, symbols, solution = generate(n, args.statements, seed=args.seed + n)
+        expected = None
+        for method in args.methods:
+            # Vectorized would silently fall back to sat past its limit
+            if method in slow or (method == "vectorized" and 2 * n > logic.VECTOR_LIMIT):
+                continue
+
+            stats = {}
+            start = time.perf_counter()
+            answers = solve(method, knowledge, symbols, stats)
+            elapsed = time.perf_counter() - start
+            print(f"{method:>10} {n:>4} {2 * n:>7} {stats.get('models', 0):>14,} "
+                  f"{stats.get('conflicts', 0):>9,} {elapsed:>9.4f}")
+
+            # Every backend must agree, and the hidden solution must be a model
+            if expected is None:
+                expected = answers
+            elif answers != expected:
+                raise Exception(f"{method} disagrees on N={n}")
+            for symbol, entailed in zip(symbols, answers):
+                if entailed and not solution[symbol.name]:
+                    raise Exception(f"{method} entails {symbol} on N={n}")
+
+            if elapsed > args.budget:
+                slow.add(method)
+
+
+if __name__ == "__main__":
+    main()
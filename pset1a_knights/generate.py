@@ -0,0 +1,79 @@
+import random
+import string
+
+from logic import *
+
+
+def character_name(i):
+    """Returns A, B, ..., Z, AA, AB, ... for i = 0, 1, ..."""
+    name = ""
+    i += 1
+    while i:
+        i, letter = divmod(i - 1, 26)
+        name = string.ascii_uppercase[letter] + name
+    return name
+
+
+def characters(n):
+    """Returns [(knight, knave)] symbol pairs for n characters."""
+    return [(Symbol(f"{character_name(i)} is a Knight"),
+             Symbol(f"{character_name(i)} is a Knave"))
+            for i in range(n)]
+
+
+def statement(people, speaker, rng):
+    """
+    Returns a random sentence about the characters that speaker, an
+    index into people, could say.
+    """
+    others = [i for i in range(len(people)) if i != speaker] or [speaker]
+    x = rng.choice(others)
+    y = rng.choice(others)
+    kind = rng.randrange(5)
+    if kind == 0:
+        # "X is a knight."
+        return people[x][0]
+    if kind == 1:
+        # "X is a knave."
+        return people[x][1]
+    if kind == 2:
+        # "X and Y are the same kind."
+        return Biconditional(people[x][0], people[y][0])
+    if kind == 3:
+        # "If X is a knight, Y is a knave."
+        return Implication(people[x][0], people[y][1])
+    # "X or I am a knave."
+    return Or(people[x][1], people[speaker][1])
+
+
+def generate(n, statements=1, seed=None):
+    """
+    Builds a random knights-and-knaves puzzle with n characters, each
+    making statements claims, that has at least one solution.
+
+    Returns (knowledge, symbols, solution): the puzzle as one sentence,
+    every knight and knave symbol, and the hidden assignment it was
+    built around as {symbol name: truth}.
+    """
+    rng = random.Random(seed)
+    people = characters(n)
+    solution = {}
+    for knight, knave in people:
+        is_knight = rng.random() < 0.5
+        solution[knight.name] = is_knight
+        solution[knave.name] = not is_knight
+
+    # Each character is exactly one of knight or knave
+    sentences = [Biconditional(knight, Not(knave)) for knight, knave in people]
+
+    # Knights say what is true and knaves what is false, so a claim that
+    # doesn't fit the hidden solution is put in the speaker's mouth negated
+    for speaker, (knight, knave) in enumerate(people):
+        for _ in range(statements):
+            claim = statement(people, speaker, rng)
+            if claim.evaluate(solution) != solution[knight.name]:
+                claim = Not(claim)
+            sentences.append(Biconditional(knight, claim))
+
+    symbols = [symbol for pair in people for symbol in pair]
+    return And(*sentences), symbols, solution
@@ -1,10 +1,80 @@
 import itertools
+import multiprocessing
+import os
+import weakref
+
+# Most symbols model_check evaluates as whole truth-table columns; each
+# column is an int of 2^n bits, so 24 symbols take 2 MiB per column
+VECTOR_LIMIT = 24
+
+# Deepest inline nesting compile() emits before moving a subformula
+# into a local of its own; Python's parser stops at 200 parentheses
+NEST_LIMIT = 32
+
+# Deepest sentence evaluate() walks recursively; deeper ones are
+# evaluated as a truth table of one model, which uses no recursion
+EVALUATE_LIMIT = 200
+
+# Intern key, (class, arguments) by default -> the one live sentence
+# built from them
+interned = weakref.WeakValueDictionary()
+
+# Models a parallel_check worker checks between looks at the stop flag
+PARALLEL_CHUNK = 1 << 14
+
+# Compiled check and stop flag of a parallel_check worker process
+checker = None
+stop = None
 
 
 class Sentence():
+    """
+    Sentences are immutable and hash-consed: building a sentence equal
+    to a live one returns that same object, so equality is identity and
+    the hash is computed once.
+    """
+
+    __slots__ = ("args", "hash", "depth", "symbol_set", "__weakref__")
+
+    @classmethod
+    def intern(cls, args, key=None, **fields):
+        """
+        Returns the live cls sentence built from args, creating it if
+        needed. key tells live sentences apart and defaults to (cls, args).
+        """
+        if key is None:
+            key = (cls, args)
+        sentence = interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            fields.setdefault("symbol_set", None)
+            if "depth" not in fields:
+                fields["depth"] = 1 + max([arg.depth for arg in args], default=0)
+            fields.update(args=args, hash=hash((cls.__name__, args)))
+            for field, value in fields.items():
+                object.__setattr__(sentence, field, value)
+            interned[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self.hash
+
+    def __reduce__(self):
+        # Unpickling rebuilds through the constructor, so it interns too
+        return (type(self), self.args)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
+        if self.depth <= EVALUATE_LIMIT:
+            return self.truth(model)
+        columns = {name: 1 if value else 0 for name, value in model.items()}
+        return self.column(columns, 1) == 1
+
+    def truth(self, model):
+        """Evaluates the sentence recursively, stopping early where it can."""
         raise Exception("nothing to evaluate")
 
     def formula(self):
@@ -12,8 +82,109 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        # Filled in bottom-up with an explicit stack, so deep sentences
+        # don't run into the recursion limit
+        stack = [self]
+        while stack:
+            sentence = stack[-1]
+            if sentence.symbol_set is not None:
+                stack.pop()
+                continue
+            pending = [child for child in sentence.children() if child.symbol_set is None]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            symbols = frozenset().union(*[child.symbol_set for child in sentence.children()])
+            object.__setattr__(sentence, "symbol_set", symbols)
+        return self.symbol_set
+
+    def children(self):
+        """Returns the sentences this sentence is built from."""
+        return self.args
+
+    def postorder(self, done=()):
+        """
+        Returns the distinct subformulas of the sentence not in done, each
+        after all of its children. Walks with an explicit stack, so deep
+        sentences don't run into the recursion limit.
+        """
+        order = []
+        seen = set()
+        stack = [self]
+        while stack:
+            sentence = stack[-1]
+            if sentence in seen or sentence in done:
+                stack.pop()
+                continue
+            pending = [child for child in sentence.children()
+                       if child not in seen and child not in done]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            seen.add(sentence)
+            order.append(sentence)
+        return order
+
+    def expression(self, operands, bits):
+        """
+        Returns Python source evaluating the sentence over an int model
+        m, given source for each of its children in operands, where bits
+        maps each symbol name to its bit in m.
+        """
+        raise Exception("nothing to evaluate")
+
+    def compile(self, names=None):
+        """
+        Returns a function of one int model, bit i true when symbol
+        names[i] is, that evaluates the sentence. names defaults to the
+        sentence's symbols in sorted order.
+
+        Subformulas are inlined as one expression until they nest
+        NEST_LIMIT deep, then assigned to a local, so the generated code
+        stays flat however deep the sentence is.
+        """
+        if names is None:
+            names = sorted(self.symbols())
+        bits = {name: 1 << i for i, name in enumerate(names)}
+
+        # sentence -> (source, depth), filled in children first
+        lines = []
+        done = {}
+        for sentence in self.postorder():
+            children = sentence.children()
+            source = sentence.expression([done[child][0] for child in children], bits)
+            depth = 1 + max([done[child][1] for child in children], default=0)
+            if depth >= NEST_LIMIT:
+                lines.append(f"    t{len(lines)} = {source}")
+                source, depth = f"t{len(lines) - 1}", 1
+            done[sentence] = (source, depth)
+
+        lines.append(f"    return bool({done[self][0]})")
+        namespace = {}
+        exec("def check(m):\n" + "\n".join(lines), namespace)
+        return namespace["check"]
+
+    def column(self, columns, full):
+        """
+        Returns the sentence's truth table as an int whose bit m is set
+        when the sentence holds in model m. columns maps each symbol name
+        to its own column, and full has one bit set per model.
+        """
+        values = {}
+        for sentence in self.postorder():
+            operands = [values[child] for child in sentence.children()]
+            values[sentence] = sentence.vector(operands, columns, full)
+        return values[self]
+
+    def vector(self, operands, columns, full):
+        """
+        Returns the sentence's column, as column() does, given the column
+        of each of its children in operands.
+        """
+        raise Exception("nothing to evaluate")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,20 +214,18 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        # Names that are equal but of different types, like 1 and True,
+        # must not share a symbol
+        return cls.intern((name,), key=(cls, type(name), name), name=name,
+                          depth=1, symbol_set=frozenset([name]))
 
     def __repr__(self):
         return self.name
 
-    def evaluate(self, model):
+    def truth(self, model):
         try:
             return bool(model[self.name])
         except KeyError:
@@ -65,47 +234,52 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def children(self):
+        return ()
 
+    def expression(self, operands, bits):
+        try:
+            return f"m & {bits[self.name]}"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    def vector(self, operands, columns, full):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+class Not(Sentence):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern((operand,), operand=operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def truth(self, model):
+        return not self.operand.truth(model)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def expression(self, operands, bits):
+        return f"not ({operands[0]})"
+
+    def vector(self, operands, columns, full):
+        return full ^ operands[0]
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return cls.intern(conjuncts, conjuncts=conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,11 +288,10 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("sentences are immutable; use KnowledgeBase.add instead")
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def truth(self, model):
+        return all(conjunct.truth(model) for conjunct in self.conjuncts)
 
     def formula(self):
         if len(self.conjuncts) == 1:
@@ -126,30 +299,32 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def expression(self, operands, bits):
+        if not operands:
+            return "True"
+        return " and ".join(f"({operand})" for operand in operands)
+
+    def vector(self, operands, columns, full):
+        result = full
+        for operand in operands:
+            result &= operand
+        return result
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        return cls.intern(disjuncts, disjuncts=disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def truth(self, model):
+        return any(disjunct.truth(model) for disjunct in self.disjuncts)
 
     def formula(self):
         if len(self.disjuncts) == 1:
@@ -157,82 +332,118 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def expression(self, operands, bits):
+        if not operands:
+            return "False"
+        return " or ".join(f"({operand})" for operand in operands)
+
+    def vector(self, operands, columns, full):
+        result = 0
+        for operand in operands:
+            result |= operand
+        return result
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return cls.intern((antecedent, consequent),
+                          antecedent=antecedent, consequent=consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def truth(self, model):
+        return ((not self.antecedent.truth(model))
+                or self.consequent.truth(model))
 
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def expression(self, operands, bits):
+        antecedent, consequent = operands
+        return f"not ({antecedent}) or ({consequent})"
+
+    def vector(self, operands, columns, full):
+        antecedent, consequent = operands
+        return (full ^ antecedent) | consequent
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return cls.intern((left, right), left=left, right=right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+    def truth(self, model):
+        return self.left.truth(model) == self.right.truth(model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def expression(self, operands, bits):
+        left, right = operands
+        return f"(not ({left})) == (not ({right}))"
+
+    def vector(self, operands, columns, full):
+        left, right = operands
+        return full ^ left ^ right
+
+
+def model_check(knowledge, query, method="vectorized", processes=None, stats=None):
+    """
+    Checks if knowledge base entails query.
+
+    method "enumerate" walks the sentence trees for each model, which
+    is how model_check has always worked; "compiled" compiles both
+    sentences to one function and runs it over every model as an int;
+    "parallel" splits the compiled run across processes worker
+    processes; "sat" asks the CDCL solver in sat.py, which does not
+    enumerate models at all. The default, "vectorized", evaluates both
+    sentences over every model at once as truth-table columns, and
+    switches to "sat" past VECTOR_LIMIT (24) symbols, where 2^n models
+    are too many to enumerate.
+
+    If stats is a dict, stats["models"] is increased by the number of
+    models evaluated, or stats["conflicts"] by the solver's conflicts.
+    So with the default method, a knowledge base past VECTOR_LIMIT
+    symbols counts "conflicts" rather than "models"; pass
+    method="enumerate" to keep the old counts.
+    """
+    if method == "parallel":
+        return parallel_check(knowledge, query, processes, stats=stats)
+    if method == "vectorized":
+        symbols = knowledge.symbols() | query.symbols()
+        if len(symbols) <= VECTOR_LIMIT:
+            return vector_check(knowledge, query, stats)
+        method = "sat"
+    if method == "compiled":
+        return compiled_check(knowledge, query, stats)
+    if method == "sat":
+        from sat import sat_check
+        return sat_check(knowledge, query, stats)
+    if method != "enumerate":
+        raise Exception(f"unknown method {method}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
         # If model has an assignment for each symbol
         if not symbols:
+            if stats is not None:
+                tally(stats, "models", 1)
 
             # If knowledge base is true in model, then query must also be true
             if knowledge.evaluate(model):
@@ -257,7 +468,215 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def tally(stats, key, amount):
+    """Adds amount to stats[key], if stats is a dict."""
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+
+def compiled_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query by evaluating the compiled
+    sentence "knowledge => query" over all 2^n models.
+    """
+    names = sorted(knowledge.symbols() | query.symbols())
+    check = Implication(knowledge, query).compile(names)
+    models = 1 << len(names)
+    counter = next(itertools.filterfalse(check, range(models)), None)
+    tally(stats, "models", models if counter is None else counter + 1)
+    return counter is None
+
+
+def start_checker(knowledge, query, names, event):
+    """Compiles the check once per parallel_check worker process."""
+    global checker, stop
+    checker = Implication(knowledge, query).compile(names)
+    stop = event
+
+
+def check_range(bounds):
+    """
+    Checks the models in range(*bounds) in a worker process. Returns
+    (result, models checked): result is False on a counter-model, True
+    if there is none, and None if another worker found one first.
+    """
+    start, end = bounds
+    for low in range(start, end, PARALLEL_CHUNK):
+        if stop.is_set():
+            return None, low - start
+        high = min(low + PARALLEL_CHUNK, end)
+        counter = next(itertools.filterfalse(checker, range(low, high)), None)
+        if counter is not None:
+            stop.set()
+            return False, counter + 1 - start
+    return True, end - start
+
+
+def parallel_check(knowledge, query, processes=None, split=None, stats=None):
+    """
+    Checks if knowledge base entails query like compiled_check, fixing
+    the split highest-bit symbols to cut the models into 2^split ranges
+    that a pool of processes checks independently. The first
+    counter-model found stops every worker.
+    """
+    names = sorted(knowledge.symbols() | query.symbols())
+    processes = processes or os.cpu_count() or 1
+    if split is None:
+        # A few ranges per process, so one slow range doesn't idle the rest
+        split = (4 * processes - 1).bit_length()
+    split = min(split, len(names))
+    size = 1 << (len(names) - split)
+    ranges = [(i * size, (i + 1) * size) for i in range(1 << split)]
+
+    event = multiprocessing.Event()
+    with multiprocessing.Pool(processes, start_checker,
+                              (knowledge, query, names, event)) as pool:
+        for result, models in pool.imap_unordered(check_range, ranges):
+            tally(stats, "models", models)
+            if result is False:
+                return False
+    return True
+
+
+def truth_columns(names):
+    """
+    Returns ({name: column}, full) for the models of names: bit m of
+    names[i]'s column is bit i of m, so the pattern repeats every
+    2^(i+1) models.
+    """
+    size = 1 << len(names)
+    full = (1 << size) - 1
+    columns = {}
+    for i, name in enumerate(names):
+        half = 1 << i
+        column = ((1 << half) - 1) << half
+        # Double the repeating pattern with shifts; big-int division
+        # would be quadratic in the column length
+        width = 2 * half
+        while width < size:
+            column |= column << width
+            width *= 2
+        columns[name] = column
+    return columns, full
+
+
+def vector_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query by evaluating both over all
+    models at once: no model may satisfy knowledge but not query.
+    """
+    names = sorted(knowledge.symbols() | query.symbols())
+    if len(names) > VECTOR_LIMIT:
+        raise Exception(f"{len(names)} symbols is past the limit of {VECTOR_LIMIT}")
+    columns, full = truth_columns(names)
+    tally(stats, "models", 1 << len(names))
+    kb = knowledge.column(columns, full)
+    return kb & ~query.column(columns, full) == 0
+
+
+class KnowledgeBase():
+    """
+    Sentences asserted together and queried many times. Answers are
+    memoized until the next add(), and batches of queries share work:
+    up to VECTOR_LIMIT symbols the knowledge base's truth-table column
+    is computed once for every query, and past it one SAT solver keeps
+    its clauses between queries, with each counter-model found ruling
+    out every other query it falsifies.
+    """
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.answers = {}
+        self.table = None
+        self.cnf = None
+        self.solver = None
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Asserts sentence, forgetting answers given so far."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.answers.clear()
+        self.table = None
+        if self.solver is not None:
+            start = len(self.cnf.clauses)
+            self.cnf.add(sentence)
+            for clause in self.cnf.clauses[start:]:
+                self.solver.add_clause(clause)
+
+    def knowledge(self):
+        """Returns the knowledge base as one sentence."""
+        return And(*self.sentences)
+
+    def symbols(self):
+        return frozenset().union(*[sentence.symbols() for sentence in self.sentences])
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return self.ask(query)[0]
+
+    def ask(self, *queries, stats=None):
+        """
+        Returns whether the knowledge base entails each query, in order.
+        stats is counted into as by model_check.
+        """
+        for query in queries:
+            Sentence.validate(query)
+        pending = [query for query in dict.fromkeys(queries) if query not in self.answers]
+        if pending:
+            names = self.symbols().union(*[query.symbols() for query in pending])
+            if len(names) <= VECTOR_LIMIT:
+                self.ask_vectorized(pending, names, stats)
+            else:
+                self.ask_sat(pending, stats)
+        return [self.answers[query] for query in queries]
+
+    def ask_vectorized(self, queries, names, stats=None):
+        if self.table is None or not names <= self.table[0].keys():
+            columns, full = truth_columns(sorted(names))
+            tally(stats, "models", 1 << len(names))
+            self.table = (columns, full, self.knowledge().column(columns, full))
+        columns, full, kb = self.table
+        for query in queries:
+            self.answers[query] = kb & ~query.column(columns, full) == 0
+
+    def ask_sat(self, queries, stats=None):
+        from sat import CNF, Solver
+        if self.solver is None:
+            self.cnf = CNF()
+            for sentence in self.sentences:
+                self.cnf.add(sentence)
+            self.solver = Solver(self.cnf.clauses)
+
+        start = len(self.cnf.clauses)
+        literals = {query: self.cnf.literal(query) for query in queries}
+        for clause in self.cnf.clauses[start:]:
+            self.solver.add_clause(clause)
+
+        conflicts = self.solver.conflicts
+        undecided = list(queries)
+        while undecided:
+            query = undecided.pop()
+            if not self.solver.solve([-literals[query]]):
+                self.answers[query] = True
+                continue
+
+            # The counter-model refutes every query that is false in it
+            self.answers[query] = False
+            model = self.solver.model
+            remaining = []
+            for other in undecided:
+                literal = literals[other]
+                if model.get(abs(literal), False) != (literal > 0):
+                    self.answers[other] = False
+                else:
+                    remaining.append(other)
+            undecided = remaining
+        tally(stats, "conflicts", self.solver.conflicts - conflicts)
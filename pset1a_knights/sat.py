@@ -0,0 +1,378 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol
+
+
+class CNF():
+    """
+    Compiles Sentence trees into clauses over integer literals.
+
+    Each symbol name gets a positive variable number, a negative literal
+    is its negation, and every compound subformula gets a fresh variable
+    tied to it by Tseitin clauses, so the clause count stays linear in
+    the size of the sentence. Structurally equal subformulas share one
+    variable.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.clauses = []
+        self.count = 0
+        self.literals = {}
+        self.true = None
+
+    def fresh(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """Returns the variable standing for a symbol name."""
+        if name not in self.variables:
+            self.variables[name] = self.fresh()
+        return self.variables[name]
+
+    def constant(self, value):
+        """Returns a literal that is always value."""
+        if self.true is None:
+            self.true = self.fresh()
+            self.clauses.append([self.true])
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when sentence is."""
+        Sentence.validate(sentence)
+        # Children are encoded before their parents, so deep sentences
+        # don't run into the recursion limit
+        for part in sentence.postorder(self.literals):
+            parts = [self.literals[child] for child in part.children()]
+            self.literals[part] = self.encode(part, parts)
+        return self.literals[sentence]
+
+    def encode(self, sentence, parts):
+        """
+        Returns the literal for sentence, given the literal of each of
+        its children in parts, adding the clauses that define it.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -parts[0]
+
+        if isinstance(sentence, And):
+            if not parts:
+                return self.constant(True)
+            v = self.fresh()
+            for part in parts:
+                self.clauses.append([-v, part])
+            self.clauses.append([v] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            if not parts:
+                return self.constant(False)
+            v = self.fresh()
+            for part in parts:
+                self.clauses.append([v, -part])
+            self.clauses.append([-v] + parts)
+        elif isinstance(sentence, Implication):
+            a, b = parts
+            v = self.fresh()
+            self.clauses += [[-v, -a, b], [v, a], [v, -b]]
+        elif isinstance(sentence, Biconditional):
+            a, b = parts
+            v = self.fresh()
+            self.clauses += [[-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]]
+        else:
+            raise TypeError("must be a logical sentence")
+        return v
+
+    def add(self, sentence):
+        """
+        Asserts sentence. Conjunctions are split and disjunctions of
+        literals become a single clause, skipping the Tseitin variable.
+        """
+        stack = [sentence]
+        while stack:
+            sentence = stack.pop()
+            if isinstance(sentence, And):
+                stack.extend(reversed(sentence.conjuncts))
+            elif isinstance(sentence, Or) and all(
+                isinstance(d, Symbol) or (isinstance(d, Not) and isinstance(d.operand, Symbol))
+                for d in sentence.disjuncts
+            ):
+                self.clauses.append([self.literal(d) for d in sentence.disjuncts])
+            else:
+                self.clauses.append([self.literal(sentence)])
+
+
+class Solver():
+    """
+    Conflict-driven clause-learning SAT solver.
+
+    Clauses are lists of nonzero ints. Unit propagation uses two watched
+    literals per clause, conflicts are analysed to the first unique
+    implication point and learned, branching follows VSIDS activity with
+    phase saving, and the search restarts on a geometric schedule.
+    Clauses may be added between solve() calls, and learned clauses are
+    kept, so a solver can answer many queries against the same clauses.
+    """
+
+    def __init__(self, clauses=()):
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [-1]
+        self.heap = []
+        self.bump = 1.0
+
+        self.watches = {}
+        self.clauses = []
+        self.learned = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def ensure(self, var):
+        while len(self.value) <= var:
+            self.value.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(-1)
+            heapq.heappush(self.heap, (0.0, len(self.value) - 1))
+
+    def lit_value(self, lit):
+        """1 if lit is true, -1 if false, 0 if unassigned."""
+        value = self.value[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, lits):
+        """Adds a clause; returns False once the clauses are unsatisfiable."""
+        if not self.ok:
+            return False
+        self.backtrack(0)
+
+        clause = []
+        for lit in lits:
+            self.ensure(abs(lit))
+            if -lit in clause:
+                return True
+            value = self.lit_value(lit)
+            if value == 1:
+                return True
+            if value == 0 and lit not in clause:
+                clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.value[var] = 1 if lit > 0 else -1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """Runs unit propagation; returns a conflicting clause or None."""
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = self.watches.get(false_lit, [])
+            kept = []
+
+            i = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.lit_value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.lit_value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.lit_value(clause[0]) == -1:
+                        kept.extend(watching[i:])
+                        self.watches[false_lit] = kept
+                        self.qhead = len(self.trail)
+                        return clause
+                    self.enqueue(clause[0], clause)
+
+            self.watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (learned clause, backjump level) for a conflict, with the
+        asserting literal first.
+        """
+        seen = set()
+        learned = [None]
+        current = len(self.trail_lim)
+        pending = 0
+        index = len(self.trail) - 1
+        lit = None
+        clause = conflict
+
+        while True:
+            for other in clause:
+                if other == lit:
+                    continue
+                var = abs(other)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump_activity(var)
+                    if self.level[var] == current:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            seen.discard(abs(lit))
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(lit)]
+
+        learned[0] = -lit
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the deepest of the remaining literals second
+        deepest = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump_activity(self, var):
+        self.activity[var] += self.bump
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+            self.heap = [(-a, v) for v, a in enumerate(self.activity) if v]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        for lit in self.trail[self.trail_lim[level]:]:
+            var = abs(lit)
+            self.phase[var] = self.value[var]
+            self.value[var] = 0
+            self.reason[var] = None
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def pick_branch(self):
+        """Returns the unassigned variable with the highest activity, or None."""
+        while self.heap:
+            _, var = heapq.heappop(self.heap)
+            if self.value[var] == 0:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        assumptions true, recording a satisfying assignment in model.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        for lit in assumptions:
+            self.ensure(abs(lit))
+
+        restart = 100
+        since_restart = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.attach(learned)
+                    self.learned.append(learned)
+                    self.enqueue(learned[0], learned)
+                self.bump /= 0.95
+                continue
+
+            if since_restart >= restart:
+                since_restart = 0
+                restart = int(restart * 1.5)
+                self.backtrack(0)
+                continue
+
+            # Assumptions are decided first, one per level
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                lit = assumptions[level]
+                value = self.lit_value(lit)
+                if value == -1:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value == 0:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                self.model = {v: self.value[v] == 1 for v in range(1, len(self.value))}
+                self.backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] == 1 else -var, None)
+
+
+def sat_check(knowledge, query, stats=None):
+    """
+    Checks if knowledge base entails query, like logic.model_check, by
+    testing knowledge AND NOT query for unsatisfiability. If stats is a
+    dict, stats["conflicts"] is increased by the conflicts hit.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    query = cnf.literal(query)
+    solver = Solver(cnf.clauses)
+    satisfiable = solver.solve([-query])
+    if stats is not None:
+        stats["conflicts"] = stats.get("conflicts", 0) + solver.conflicts
+    return not satisfiable
@@ -1,5 +1,6 @@
 import itertools
 import random
+from collections import deque
 
 
 class Minesweeper():
@@ -105,16 +106,17 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        # 
         if self.count and self.count == len(self.cells):
-            return self.cells
+            return set(self.cells)
+        return set()
 
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
         """
-        if self.count == 0 and len(self.cells) > 0:
-            return self.cells
+        if self.count == 0:
+            return set(self.cells)
+        return set()
 
     def mark_mine(self, cell):
         """
@@ -122,19 +124,15 @@ class Sentence():
         a cell is known to be a mine.
         """
         if cell in self.cells:
-            # Remove this cell and self.count -= 1
-            self.count = self.count - 1
-            self.cells =  {c for c in self.cells if c != cell}
-
+            self.cells.discard(cell)
+            self.count -= 1
 
     def mark_safe(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells:
-            # Remove the safe cell. Do not update the count
-            self.cells = {c for c in self.cells if c != cell}
+        self.cells.discard(cell)
 
 
 class MinesweeperAI():
@@ -155,8 +153,19 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Safe cells not yet clicked, so a safe move needs no scan
+        self.safe_moves = set()
+
+        # Sentences about the game known to be true, by id()
+        self.knowledge = {}
+
+        # Inverted index: cell -> {id: sentence} of sentences containing it,
+        # so marking a cell only touches the sentences it appears in
+        self.index = {}
+
+        # Sentences changed since inference last looked at them
+        self.dirty = deque()
+        self.queued = set()
 
     def mark_mine(self, cell):
         """
@@ -164,19 +173,38 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.index.pop(cell, {}).values():
             sentence.mark_mine(cell)
+            self.touch(sentence)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        # print(f"Marking Safe {cell}")
-        
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for sentence in self.index.pop(cell, {}).values():
             sentence.mark_safe(cell)
+            self.touch(sentence)
+
+    def touch(self, sentence):
+        """Queues a changed sentence for inference."""
+        if id(sentence) not in self.queued:
+            self.queued.add(id(sentence))
+            self.dirty.append(sentence)
+
+    def add_sentence(self, sentence):
+        self.knowledge[id(sentence)] = sentence
+        for cell in sentence.cells:
+            self.index.setdefault(cell, {})[id(sentence)] = sentence
+        self.touch(sentence)
+
+    def remove_sentence(self, sentence):
+        del self.knowledge[id(sentence)]
+        for cell in sentence.cells:
+            del self.index[cell][id(sentence)]
 
     def add_knowledge(self, cell, count):
         """
@@ -193,141 +221,73 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         self.mark_safe(cell)
 
-        # print(f"\nBEGIN MOVE: {cell} == {count}")
-        new_k = set()
-
-        # Selected cell's position
-        row = cell[0]
-        col = cell[1]
-
-        # Generate the new knowledge set
-        start_row = (row - 1) if row != 0 else 0
-        while start_row <= row + 1 and start_row < self.height:
-            # print(f"scan row -- {start_row}")
-            start_col = (col - 1) if col != 0 else  0
-            while start_col <= col + 1 and start_col < self.width:
-                
-                # print(f"[>>]({start_row}, {start_col})[<<]")
-
-                # Skip any cells which have known states
-                if \
-                    (start_row, start_col) in self.mines or \
-                    (start_row, start_col) in self.moves_made or \
-                    (start_row, start_col) in self.safes:
-
-                    # If we already know of a mine from this count
-                    # ignore it and decrement the count
-                    if (start_row, start_col) in self.mines:
-                        count = count - 1
-                        # print(f"[RemovingMineInfo] Count is now {count}")
-                    else:
-                        pass
+        # Neighbors whose state is unknown; known mines come off the count
+        unknown = set()
+        for i in range(max(0, cell[0] - 1), min(self.height, cell[0] + 2)):
+            for j in range(max(0, cell[1] - 1), min(self.width, cell[1] + 2)):
+                if (i, j) in self.mines:
+                    count -= 1
+                elif (i, j) not in self.safes:
+                    unknown.add((i, j))
 
-                else:
+        if unknown:
+            self.add_sentence(Sentence(unknown, count))
+        self.infer()
 
-                    # General assertion. All knowledge must fit this condition
-                    if start_row >= 0 and start_row < self.height \
-                    and start_col >= 0 and start_col < self.width:
-
-                        # No need to add sentences with count == 0
-                        if count == 0:
-                            # Add safe cells
-                            # print(f"[ZERO-COUNT] -- ALLES IS VIELIG {(start_row, start_col)}")
-                            self.mark_safe((start_row, start_col))
-
-                        else:
-                            # Superflous assertion. Inverse of the first condition
-                            if (start_row, start_col) not in self.moves_made or \
-                            (start_row, start_col) not in self.safes or \
-                            (start_row, start_col) not in self.mines:
-                                new_k.add(tuple((start_row, start_col)))
-
-                start_col += 1
-
-            start_row += 1
-        
-        # Found mine(s)
-        if len(new_k) == count and count:
-            # print("[MINE--ALL--MINE]")
-            for c in new_k:
-                print(c)
-                self.mark_mine(c)
-
-        elif new_k:
-            # Feed brain
-            self.knowledge.append(Sentence(new_k, count))
-
-        # Condense our knowledge and draw inferences
-        self.recollect_knowledge()
-
-        # print("\nKNOWLEDGE BASE:")
-        for sent in self.knowledge:
-            # Being memory friendly
-            if not sent.cells:
-                self.knowledge.remove(sent)
+    def infer(self):
+        """
+        Draws conclusions from the dirty sentences until nothing changes.
+        Marking cells and shrinking sentences queue the sentences they
+        touch, so only knowledge that changed is looked at again.
+        """
+        while self.dirty:
+            sentence = self.dirty.popleft()
+            self.queued.discard(id(sentence))
+            if self.knowledge.get(id(sentence)) is not sentence:
                 continue
 
-            try:
-                # print(f"{sent.cells} = {sent.count}")
-                for n in sent.known_safes():
-                        # print(f"N - Marking Safe: {n}")
-                    self.mark_safe(n)
-
-                for n in sent.known_mines():
-                        # print(f"MM - Marking Mine {n}")
-                    self.mark_mine(n)
-
-            except TypeError:
-                pass
-
-        # print("\nMINES:")
-        # print(self.mines)
-
-        # print("SAFES:")
-        # print(self.safes)
-
-
-    def recollect_knowledge(self):
-        k_buffer = []
-        updated = False
-
-        # For every sentence, see if it contains a subset of another
-        for i in range(len(self.knowledge)):
+            if not sentence.cells:
+                self.remove_sentence(sentence)
+                continue
 
-            cur_sentence = self.knowledge[i]
+            # Every cell is safe, or every cell is a mine
+            if sentence.count == 0 or sentence.count == len(sentence.cells):
+                cells = list(sentence.cells)
+                known = self.mark_safe if sentence.count == 0 else self.mark_mine
+                self.remove_sentence(sentence)
+                for cell in cells:
+                    known(cell)
+                continue
 
-            # "Another"
-            for j in range(len(self.knowledge)):
+            # Only sentences sharing a cell can be a subset or superset
+            related = {}
+            for cell in sentence.cells:
+                related.update(self.index[cell])
+            related.pop(id(sentence))
 
-                # Don't compare a sentence to itself
-                if j == i:
+            for other in related.values():
+                if self.knowledge.get(id(other)) is not other:
                     continue
+                if sentence.cells < other.cells:
+                    self.subtract(other, sentence)
+                elif other.cells < sentence.cells:
+                    self.subtract(sentence, other)
+                    break
 
-                else:
-                    # If cur_cells is a subset of [j]cells
-                    if cur_sentence.cells < self.knowledge[j].cells \
-                    and len(cur_sentence.cells):
-
-                        # print("\nORIGINAL SET [J]")
-                        # print(f"{self.knowledge[j].cells} ==== {self.knowledge[j].count}")
-                        # print("\nCUR_SENTENCE [SUB]")
-                        # print(f"{cur_sentence.cells} ==== {cur_sentence.count}")
-
-                        # Difference of set from subset
-                        new_set = self.knowledge[j].cells - cur_sentence.cells
-                        # Difference in count
-                        new_count = self.knowledge[j].count - cur_sentence.count
-
-                        # print("\nNEW SET [x]")
-                        # print(f"{new_set} ==== {new_count}")
-
-                        self.knowledge[j].cells = new_set
-                        self.knowledge[j].count = new_count
-
+    def subtract(self, superset, subset):
+        """
+        Replaces superset with the cells it has beyond subset, and the
+        mines those must hold, keeping the index up to date.
+        """
+        for cell in subset.cells:
+            del self.index[cell][id(superset)]
+        superset.cells = superset.cells - subset.cells
+        superset.count = superset.count - subset.count
+        self.touch(superset)
 
     def make_safe_move(self):
         """
@@ -338,18 +298,8 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        c_safes = self.safes.copy()
-        debug_safes = {safe for safe in c_safes if safe not in self.moves_made}
-        # print("UNUSED SAFES")
-        # print(debug_safes)
-        while len(c_safes) >= 1:
-            mv = c_safes.pop()
-            if mv in self.mines or \
-            mv in self.moves_made:
-                pass
-            else:
-                return mv
-
+        for cell in self.safe_moves:
+            return cell
         return None
 
     def make_random_move(self):